@@ -0,0 +1,91 @@
+"""
+Cold-start benchmark: the time a fresh interpreter takes to import llamapay and to get
+a contract type, with the contract type cache cleared and with the cache in place.
+
+    python benchmarks/import_time.py --runs 10
+    python benchmarks/import_time.py --baseline ../ape-llamapay-old
+
+`--baseline` points at another checkout to compare with, for example one made with
+`git worktree add ../ape-llamapay-old HEAD~1`. No chain or provider is needed.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+REPO = Path(__file__).resolve().parents[1]
+
+SCRIPTS = {
+    "import": "import llamapay",
+    "contract_type": (
+        "import llamapay\n"
+        "from llamapay.constants import CONTRACT_TYPES\n"
+        "CONTRACT_TYPES['LlamaPay']"
+    ),
+}
+
+TIMER = """
+import time
+start = time.perf_counter()
+exec(compile({script!r}, "<benchmark>", "exec"))
+print(time.perf_counter() - start)
+"""
+
+
+def run(source: Path, script: str, data_folder: Path) -> float:
+    env = {**os.environ, "PYTHONPATH": str(source), "APE_DATA_FOLDER": str(data_folder)}
+    result = subprocess.run(
+        [sys.executable, "-c", TIMER.format(script=script)],
+        env=env,
+        cwd=tempfile.gettempdir(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure(source: Path, runs: int) -> Dict[str, float]:
+    results = {}
+    data_folder = Path(tempfile.mkdtemp(prefix="llamapay-bench-"))
+    try:
+        for name, script in SCRIPTS.items():
+            cold: List[float] = []
+            for _ in range(runs):
+                shutil.rmtree(data_folder / "llamapay", ignore_errors=True)
+                cold.append(run(source, script, data_folder))
+            warm = [run(source, script, data_folder) for _ in range(runs)]
+            results[f"{name}_cold"] = statistics.median(cold)
+            results[f"{name}_warm"] = statistics.median(warm)
+    finally:
+        shutil.rmtree(data_folder, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, help="checkout to compare with")
+    parser.add_argument("--output", type=Path, default=REPO / "benchmarks" / "import_time.json")
+    args = parser.parse_args()
+
+    sources = {"current": REPO}
+    if args.baseline:
+        sources["baseline"] = args.baseline.resolve()
+
+    results = {name: measure(source, args.runs) for name, source in sources.items()}
+    for name in results["current"]:
+        line = f"{name:<20}" + "".join(f"{row[name]:>10.3f}s" for row in results.values())
+        print(line)
+
+    args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
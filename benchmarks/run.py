@@ -0,0 +1,205 @@
+"""
+Benchmarks against a plain local anvil chain with synthetic pools.
+
+The manifest only has the ABIs, so the factory creation code comes from a compiled artifact,
+for example `out/LlamaPayFactory.sol/LlamaPayFactory.json` from a `forge build` of the
+LlamaPay contracts. Tokens are stubbed with a tiny contract which answers `symbol()` and
+`decimals()`, creating streams doesn't move any tokens.
+
+    python benchmarks/run.py --factory-artifact LlamaPayFactory.json --sizes 1000 10000
+
+Results are written as JSON with the wall time and the number of requests of each benchmark.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+from ape import accounts, chain, networks
+from ape.contracts import ContractContainer
+from eth_utils import to_checksum_address
+from ethpm_types import Bytecode
+
+from llamapay import Factory, Stream, stats
+from llamapay.constants import CONTRACT_TYPES, FACTORY_DEPLOYMENTS, FactoryDeployment
+from llamapay.llamapay import convert_rate
+from llamapay.store import LogStore
+
+# runtime code answering `symbol()` with "TKN" and any other call with 18
+TOKEN_RUNTIME = (
+    "60003560e01c6395d89b4114601957601260005260206000f35b"
+    "60206000526003602052"
+    "7f544b4e0000000000000000000000000000000000000000000000000000000000"
+    "60405260606000f3"
+)
+
+
+@contextmanager
+def measure(results: List[Dict], name: str, size: int):
+    stats.reset()
+    start = time.perf_counter()
+    yield
+    wall_time = time.perf_counter() - start
+    counters = stats.stats()
+    rpc_calls = sum(counters["rpc"].values())
+    results.append(
+        {
+            "name": name,
+            "size": size,
+            "wall_time": wall_time,
+            "rpc_calls": rpc_calls,
+            "rpc_by_method": counters["rpc"],
+            "rpc_by_function": counters["functions"],
+        }
+    )
+    print(f"{name:<24} {size:>8} {wall_time:>10.3f}s {rpc_calls:>8}")
+
+
+def load_bytecode(path: Path) -> str:
+    """
+    Creation code from a forge, hardhat or ethPM artifact.
+    """
+    artifact = json.loads(path.read_text())
+    bytecode = artifact.get("bytecode") or artifact["deploymentBytecode"]["bytecode"]
+    if isinstance(bytecode, dict):
+        bytecode = bytecode["object"]
+    return bytecode if bytecode.startswith("0x") else "0x" + bytecode
+
+
+def deploy_factory(bytecode: str, deployer) -> Factory:
+    contract_type = CONTRACT_TYPES["LlamaPayFactory"].copy(
+        update={"deployment_bytecode": Bytecode(bytecode=bytecode)}
+    )
+    contract = deployer.deploy(ContractContainer(contract_type))
+    FACTORY_DEPLOYMENTS.add(
+        FactoryDeployment(
+            chain_id=networks.provider.chain_id,
+            ecosystem=networks.provider.network.ecosystem.name,
+            network=networks.provider.network.name,
+            address=contract.address,
+            deploy_block=chain.blocks.height,
+        )
+    )
+    return Factory()
+
+
+def stub_token(index: int) -> str:
+    address = to_checksum_address(f"0x{0x70C3E2 + index:040x}")
+    chain.provider._make_request("anvil_setCode", [address, "0x" + TOKEN_RUNTIME])
+    return address
+
+
+def generate_streams(pool, payers, size: int) -> List[Stream]:
+    """
+    Create `size` streams split between payers, then pause and cancel some of them.
+    """
+    streams = [
+        pool.make_stream(payers[i % len(payers)], f"0x{i + 1:040x}", 10**18 + i)
+        for i in range(size)
+    ]
+    for payer in payers:
+        own = [stream for stream in streams if stream.source == payer.address]
+        with pool.batch(sender=payer) as batch:
+            for stream in own:
+                batch.create(stream)
+        with pool.batch(sender=payer) as batch:
+            for stream in own[::10]:
+                batch.pause(stream)
+            for stream in own[5::10]:
+                batch.cancel(stream)
+    return streams
+
+
+def run(sizes: List[int], bytecode: str, pools: int) -> List[Dict]:
+    results: List[Dict] = []
+    # only the middleware, wrapping the methods would skew the timings
+    networks.provider.web3.middleware_onion.add(stats.stats_middleware)
+    deployer, *payers = accounts.test_accounts[:5]
+    factory = deploy_factory(bytecode, deployer)
+
+    tokens = [stub_token(i) for i in range(max(pools, len(sizes)))]
+    for token in tokens:
+        factory.create_pool(token, sender=deployer)
+
+    with measure(results, "Factory.pools", pools):
+        assert len(Factory().pools) >= pools
+
+    for size, token in zip(sizes, tokens):
+        pool = Factory().get_pool(token)
+        streams = generate_streams(pool, payers, size)
+
+        cold = Factory(store=LogStore()).get_pool(token)
+        with measure(results, "Pool._refresh_logs", size):
+            cold._refresh_logs()
+
+        lookups = random.Random(size).sample(streams, min(100, size))
+        with measure(results, "Pool.find_streams", len(lookups)):
+            for stream in lookups:
+                cold.find_streams(target=stream.target, status=None)
+
+        with measure(results, "Pool.find_streams cold", len(lookups[:10])):
+            for stream in lookups[:10]:
+                Factory(store=LogStore()).get_pool(token).find_streams(target=stream.target)
+
+        with measure(results, "Stream.balance", len(lookups)):
+            for stream in lookups:
+                stream.balance
+
+        with measure(results, "Pool.snapshot", size):
+            cold.snapshot()
+
+    iterations = max(sizes)
+    with measure(results, "convert_rate", iterations):
+        for _ in range(iterations):
+            convert_rate("1,000 TKN/month")
+
+    source, target = payers[0].address, payers[1].address
+    with measure(results, "Stream", iterations):
+        for i in range(iterations):
+            Stream(source, target, i, pool)
+
+    with measure(results, "Stream.trusted", iterations):
+        for i in range(iterations):
+            Stream.trusted(source, target, i, pool)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--factory-artifact",
+        type=Path,
+        default=os.environ.get("LLAMAPAY_FACTORY_ARTIFACT"),
+        help="compiled LlamaPayFactory artifact [env: LLAMAPAY_FACTORY_ARTIFACT]",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--pools", type=int, default=20, help="pools to create for listing")
+    parser.add_argument("--network", default="ethereum:local:foundry")
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results.json"))
+    args = parser.parse_args()
+    if args.factory_artifact is None:
+        parser.error("the factory creation code is not in the manifest, pass --factory-artifact")
+
+    bytecode = load_bytecode(args.factory_artifact)
+    with networks.parse_network_choice(args.network):
+        results = run(args.sizes, bytecode, args.pools)
+        meta = {
+            "network": args.network,
+            "chain_id": networks.provider.chain_id,
+            "python": platform.python_version(),
+            "timestamp": int(time.time()),
+        }
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
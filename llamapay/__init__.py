@@ -1,7 +1,9 @@
+from .index import StreamStatus
 from .llamapay import Factory, Pool, Stream
 
 __all__ = [
     "Factory",
     "Pool",
     "Stream",
+    "StreamStatus",
 ]
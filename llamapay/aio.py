@@ -0,0 +1,168 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from ape.types import AddressType
+
+from llamapay.index import StreamStatus
+from llamapay.llamapay import Factory, Pool, Stream
+from llamapay.snapshot import Snapshot
+
+
+class AsyncFactory:
+    """
+    Asyncio interface to the read paths of a `Factory`.
+
+    Blocking calls run on a bounded pool of threads which share the provider and its
+    HTTP connections. Identical requests made while one is in flight share its result,
+    so many concurrent queries for the same balance cost a single call.
+
+    >>> async with AsyncFactory() as factory:
+    ...     pool = await factory.get_pool('DAI')
+    ...     await asyncio.gather(*[pool.balance(stream) for stream in streams])
+    """
+
+    def __init__(self, factory: Optional[Factory] = None, max_workers: int = 32, **kwargs):
+        self.factory = factory or Factory(**kwargs)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="llamapay")
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._pools: Dict[AddressType, "AsyncPool"] = {}
+
+    async def run(self, func: Callable, *args, key: Optional[Hashable] = None, **kwargs) -> Any:
+        """
+        Run a blocking call on the thread pool. Calls with the same `key` are coalesced.
+        """
+        loop = asyncio.get_running_loop()
+        if key is None:
+            return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shielded, so one cancelled caller doesn't cancel the call for everyone else
+        return await asyncio.shield(future)
+
+    def _wrap(self, pool: Pool) -> "AsyncPool":
+        if pool.address not in self._pools:
+            self._pools[pool.address] = AsyncPool(pool, self)
+        return self._pools[pool.address]
+
+    async def get_pool(self, token: str) -> "AsyncPool":
+        pool = await self.run(self.factory.get_pool, token, key=("get_pool", token))
+        return self._wrap(pool)
+
+    async def get_pools(self, tokens: List[str]) -> Dict[str, Optional["AsyncPool"]]:
+        pools = await self.run(self.factory.get_pools, tokens)
+        return {token: pool and self._wrap(pool) for token, pool in pools.items()}
+
+    async def pools(self) -> List["AsyncPool"]:
+        pools = await self.run(lambda: self.factory.pools, key="pools")
+        return [self._wrap(pool) for pool in pools]
+
+    async def find_streams(
+        self,
+        *,
+        source: Optional[AddressType] = None,
+        target: Optional[AddressType] = None,
+        status: Optional[StreamStatus] = StreamStatus.ACTIVE,
+    ) -> List[Stream]:
+        """
+        Find streams by source and/or target across all pools, searching the pools concurrently.
+        """
+        if not (source or target):
+            raise ValueError("must specify source or target")
+        pools = await self.pools()
+        results = await asyncio.gather(
+            *[pool.find_streams(source=source, target=target, status=status) for pool in pools]
+        )
+        return [stream for streams in results for stream in streams]
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "AsyncFactory":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class AsyncPool:
+    """
+    Asyncio interface to the read paths of a `Pool`.
+
+    Indexing a pool isn't thread-safe, so lookups which may index new logs are serialized
+    per pool. Balance reads run concurrently.
+    """
+
+    def __init__(self, pool: Pool, factory: AsyncFactory):
+        self.pool = pool
+        self.factory = factory
+        self._index_lock = asyncio.Lock()
+
+    @property
+    def address(self) -> AddressType:
+        return self.pool.address
+
+    async def symbol(self) -> str:
+        return await self.factory.run(lambda: self.pool.symbol, key=("symbol", self.address))
+
+    async def scale(self) -> int:
+        return await self.factory.run(lambda: self.pool.scale, key=("scale", self.address))
+
+    async def refresh_logs(self):
+        async with self._index_lock:
+            await self.factory.run(self.pool._refresh_logs)
+
+    async def find_streams(
+        self,
+        *,
+        source: Optional[AddressType] = None,
+        target: Optional[AddressType] = None,
+        status: Optional[StreamStatus] = StreamStatus.ACTIVE,
+    ) -> List[Stream]:
+        async with self._index_lock:
+            return await self.factory.run(
+                self.pool.find_streams, source=source, target=target, status=status
+            )
+
+    async def all_streams(self) -> List[Stream]:
+        async with self._index_lock:
+            return await self.factory.run(lambda: self.pool.all_streams)
+
+    async def get_balance(self, source: AddressType) -> Decimal:
+        key = ("get_balance", self.address, source)
+        return await self.factory.run(self.pool.get_balance, source, key=key)
+
+    async def balance(self, stream: Stream) -> Decimal:
+        """
+        Withdrawable balance of a stream, same as `Stream.balance`.
+        """
+        key = ("balance", self.address, stream.id)
+        return await self.factory.run(lambda: stream.balance, key=key)
+
+    async def balances(self, streams: List[Stream]) -> List[Optional[Decimal]]:
+        """
+        Withdrawable balances of many streams in a few multicall requests.
+        """
+        snapshot = await self.snapshot(streams=streams, payers=[])
+        return snapshot.stream_balances()
+
+    async def snapshot(self, **kwargs) -> Snapshot:
+        if kwargs.get("streams") is None:
+            kwargs["streams"] = await self.all_streams()
+        return await self.factory.run(self.pool.snapshot, **kwargs)
+
+    async def streams_at(
+        self, block: Optional[int] = None, *, timestamp: Optional[datetime] = None
+    ) -> List[Stream]:
+        async with self._index_lock:
+            return await self.factory.run(self.pool.streams_at, block, timestamp=timestamp)
+
+    def __repr__(self):
+        return f"<AsyncPool address={self.address}>"
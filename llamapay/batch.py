@@ -0,0 +1,192 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from ape.api import ReceiptAPI
+from ape.utils import ManagerAccessMixin
+
+from llamapay.constants import CONTRACT_TYPES
+from llamapay.multicall import Call
+
+if TYPE_CHECKING:
+    from llamapay.llamapay import Pool, Stream
+
+# conservative gas cost of each operation inside a batch, used to split batches
+GAS_ESTIMATES = {
+    "create": 90_000,
+    "pause": 80_000,
+    "cancel": 80_000,
+    "replace": 160_000,
+    "send": 80_000,
+}
+
+# event emitted by a successful operation and the argument holding the stream id
+EXPECTED_EVENTS = {
+    "create": ("StreamCreated", "streamId"),
+    "pause": ("StreamPaused", "streamId"),
+    "cancel": ("StreamCancelled", "streamId"),
+    "replace": ("StreamModified", "oldStreamId"),
+    "send": ("Withdraw", "streamId"),
+}
+
+
+@dataclass
+class Operation:
+    name: str
+    stream: "Stream"
+    call: Call
+
+
+@dataclass
+class BatchResult:
+    operation: str
+    stream: "Stream"
+    success: bool
+    receipt: ReceiptAPI
+
+
+class Batch(ManagerAccessMixin):
+    """
+    Queue stream operations and send them in as few `LlamaPay.batch` transactions as possible.
+
+    >>> with pool.batch(sender=dev) as batch:
+    ...     batch.create(stream)
+    ...     batch.cancel(old_stream)
+    >>> batch.results
+
+    Outcomes are read from the events in the receipt, so each stream takes part in a batch
+    at most once per kind of operation and not after it was paused, cancelled or replaced.
+    Conflicting operations raise a `ValueError` when they are queued.
+    """
+
+    def __init__(
+        self, pool: "Pool", revert_on_fail: bool = False, gas_limit: int = 10_000_000, **tx_args
+    ):
+        self.pool = pool
+        self.revert_on_fail = revert_on_fail
+        self.gas_limit = gas_limit
+        self.tx_args = tx_args
+        self.operations: List[Operation] = []
+        self.results: List[BatchResult] = []
+        # streams created and ended by the queued operations, and their expected events
+        self._started: Set[bytes] = set()
+        self._ended: Set[bytes] = set()
+        self._expected: Set[Tuple[str, bytes]] = set()
+
+    def _queue(
+        self, name: str, stream: "Stream", method: str, *args, new_stream: Optional["Stream"] = None
+    ):
+        if name != "send":
+            sender = self.tx_args.get("sender")
+            assert sender == stream.source, f"sender must be {stream.source}"
+        self._check_conflicts(name, stream, new_stream)
+        call = Call.from_abi(self.pool.address, CONTRACT_TYPES["LlamaPay"], method, *args)
+        self.operations.append(Operation(name, stream, call))
+
+    def _check_conflicts(self, name: str, stream: "Stream", new_stream: Optional["Stream"]):
+        """
+        Reject operations whose outcome couldn't be told apart from another one in the batch.
+        """
+        event, _ = EXPECTED_EVENTS[name]
+        started = [stream] if name == "create" else [new_stream] if new_stream else []
+        if stream.id in self._ended or (event, stream.id) in self._expected:
+            raise ValueError(f"conflicting {name} of stream {stream.id.hex()} in one batch")
+        for other in started:
+            if other.id in self._started:
+                raise ValueError(f"stream {other.id.hex()} is created twice in one batch")
+
+        self._expected.add((event, stream.id))
+        self._started.update(other.id for other in started)
+        if name in ["pause", "cancel", "replace"]:
+            self._ended.add(stream.id)
+
+    def create(self, stream: "Stream", reason: Optional[str] = None):
+        if reason:
+            self._queue(
+                "create", stream, "createStreamWithReason", stream.target, stream.rate, reason
+            )
+        else:
+            self._queue("create", stream, "createStream", stream.target, stream.rate)
+
+    def pause(self, stream: "Stream"):
+        self._queue("pause", stream, "pauseStream", stream.target, stream.rate)
+
+    def cancel(self, stream: "Stream"):
+        self._queue("cancel", stream, "cancelStream", stream.target, stream.rate)
+
+    def replace(self, stream: "Stream", new_stream: "Stream"):
+        self._queue(
+            "replace",
+            stream,
+            "modifyStream",
+            stream.target,
+            stream.rate,
+            new_stream.target,
+            new_stream.rate,
+            new_stream=new_stream,
+        )
+
+    def send(self, stream: "Stream"):
+        self._queue("send", stream, "withdraw", stream.source, stream.target, stream.rate)
+
+    withdraw = send
+
+    def _chunks(self) -> List[List[Operation]]:
+        """
+        Split operations into transactions which fit into the gas limit.
+        """
+        chunks: List[List[Operation]] = []
+        gas = self.gas_limit
+        for operation in self.operations:
+            cost = GAS_ESTIMATES[operation.name]
+            if gas + cost > self.gas_limit:
+                chunks.append([])
+                gas = 0
+            chunks[-1].append(operation)
+            gas += cost
+
+        return chunks
+
+    def execute(self) -> List[BatchResult]:
+        """
+        Send all queued operations and map the outcome back to each stream.
+        """
+        for chunk in self._chunks():
+            receipt = self.pool.contract.batch(
+                [operation.call.encode() for operation in chunk],
+                self.revert_on_fail,
+                **self.tx_args,
+            )
+            emitted = self._emitted(receipt)
+            for operation in chunk:
+                event, _ = EXPECTED_EVENTS[operation.name]
+                self.results.append(
+                    BatchResult(
+                        operation=operation.name,
+                        stream=operation.stream,
+                        success=(event, operation.stream.id) in emitted,
+                        receipt=receipt,
+                    )
+                )
+
+        self.operations = []
+        self._started, self._ended, self._expected = set(), set(), set()
+        return self.results
+
+    def _emitted(self, receipt: ReceiptAPI) -> Set[Tuple[str, bytes]]:
+        emitted: Set[Tuple[str, bytes]] = set()
+        events: Dict[str, str] = dict(EXPECTED_EVENTS.values())
+        # created streams can also come with a reason
+        events["StreamCreatedWithReason"] = "streamId"
+        for event, id_field in events.items():
+            for log in receipt.decode_logs(getattr(self.pool.contract, event)):
+                name = "StreamCreated" if event == "StreamCreatedWithReason" else event
+                emitted.add((name, bytes(log.event_arguments[id_field])))
+
+        return emitted
+
+    def __enter__(self) -> "Batch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.execute()
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from ape.utils import ManagerAccessMixin
+
+from llamapay.constants import REORG_DEPTH
+from llamapay.exceptions import UnsupportedNetwork
+from llamapay.store import LogStore
+
+
+class BlockTimestamps(ManagerAccessMixin):
+    """
+    Cache of block timestamps which fetches missing blocks concurrently, each one only once.
+
+    With a store, timestamps are read from disk, and unless `save` is off, timestamps
+    of blocks which can no longer be reorganized are written to it.
+    """
+
+    def __init__(self, workers: int = 8, store: Optional[LogStore] = None, save: bool = True):
+        self.workers = workers
+        self.store = store
+        self.save = save
+        self._timestamps: Dict[int, int] = {}
+
+    def get_many(self, numbers: Iterable[int]) -> Dict[int, int]:
+        """
+        Timestamps of many blocks, fetching the ones not seen before in parallel.
+        """
+        numbers = list(dict.fromkeys(numbers))
+        missing = [number for number in numbers if number not in self._timestamps]
+        if missing and self.store:
+            self._timestamps.update(self.store.get_timestamps(self.provider.chain_id, missing))
+            missing = [number for number in missing if number not in self._timestamps]
+
+        if missing:
+            with ThreadPoolExecutor(self.workers) as executor:
+                blocks = executor.map(self.provider.get_block, missing)
+                fetched = {number: block.timestamp for number, block in zip(missing, blocks)}
+            self._timestamps.update(fetched)
+            if self.store and self.save:
+                safe = self.chain_manager.blocks.height - REORG_DEPTH
+                final = {number: value for number, value in fetched.items() if number <= safe}
+                self.store.save_timestamps(self.provider.chain_id, final)
+
+        return {number: self._timestamps[number] for number in numbers}
+
+    def __getitem__(self, number: int) -> int:
+        return self.get_many([number])[number]
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+
+def find_deploy_block(address: str, hint: Optional[int] = None) -> int:
+    """
+    Block a contract was created in, found with a binary search over its code at past blocks.
+
+    A correct `hint` costs two requests, otherwise the search takes about log2(height).
+    Needs a node which serves historical state.
+    """
+    web3 = ManagerAccessMixin.provider.web3
+
+    def has_code(block: int) -> bool:
+        return len(web3.eth.get_code(address, block_identifier=block)) > 0
+
+    low, high = 0, web3.eth.block_number
+    if not has_code(high):
+        raise UnsupportedNetwork(f"no contract at {address}")
+
+    if hint is not None and hint < high:
+        if has_code(hint):
+            if hint == 0 or not has_code(hint - 1):
+                return hint
+            high = hint - 1
+        else:
+            low = hint + 1
+
+    # the code exists at `high` and the creation block is within [low, high]
+    while low < high:
+        middle = (low + high) // 2
+        if has_code(middle):
+            high = middle
+        else:
+            low = middle + 1
+
+    return low
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with an optional time-to-live and hit/miss counters.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires = item
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return a cached value or compute and cache it. Exceptions are not cached.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ens names can be updated, so they expire
+ADDRESSES = TTLCache(maxsize=4096, ttl=3600)
+# (chain id, symbol or address) -> token address
+TOKENS = TTLCache(maxsize=1024)
+# (chain id, token address, field) -> symbol or decimals
+TOKEN_METADATA = TTLCache(maxsize=1024)
+# (chain id, factory address) -> hash of the pool creation code
+INIT_CODE_HASHES = TTLCache(maxsize=64)
+
+CACHES = {
+    "addresses": ADDRESSES,
+    "tokens": TOKENS,
+    "token_metadata": TOKEN_METADATA,
+    "init_code_hashes": INIT_CODE_HASHES,
+}
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Hit and miss counters of the lookup caches.
+    """
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+def clear_caches():
+    for cache in CACHES.values():
+        cache.clear()
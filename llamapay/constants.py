@@ -1,93 +1,225 @@
+import hashlib
+import json
 import pkgutil
+import threading
 from datetime import timedelta
-from typing import List
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Mapping, Optional
 
-from ethpm_types import PackageManifest
+from eth_utils import keccak
 from pydantic import BaseModel
 
-manifest = pkgutil.get_data(__package__, "manifest.json")
-CONTRACT_TYPES = PackageManifest.parse_raw(manifest).contract_types  # type: ignore
+from llamapay.exceptions import UnsupportedNetwork
+
+if TYPE_CHECKING:
+    from ethpm_types import ContractType
+
+
+class ContractTypes(Mapping[str, "ContractType"]):
+    """
+    Contract types from the package manifest, parsed on first use.
+
+    Parsing and validating the manifest is slow, so the validated types are written as JSON
+    into the ape data folder and later runs rebuild them from there. The cache file is named
+    after the manifest contents and the `ethpm-types` and `pydantic` versions, a stale one
+    is never read.
+    """
+
+    def __init__(self, resource: str = "manifest.json", cache_dir: Optional[Path] = None):
+        self.resource = resource
+        self.cache_dir = cache_dir
+        self._types: Optional[Dict[str, "ContractType"]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, "ContractType"]:
+        if self._types is None:
+            with self._lock:
+                if self._types is None:
+                    self._types = self._read()
+        return self._types
+
+    def _read(self) -> Dict[str, "ContractType"]:
+        manifest = pkgutil.get_data(__package__, self.resource)
+        if manifest is None:
+            raise FileNotFoundError(f"{__package__} has no resource {self.resource}")
+
+        from ethpm_types import ContractType, PackageManifest
+
+        path = self._cache_path(manifest)
+        try:
+            cached = json.loads(path.read_text())
+            return {name: ContractType.parse_obj(value) for name, value in cached.items()}
+        except Exception:
+            pass
+
+        types = PackageManifest.parse_raw(manifest).contract_types or {}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp = path.with_suffix(".tmp")
+            data = {name: json.loads(value.json(by_alias=True)) for name, value in types.items()}
+            temp.write_text(json.dumps(data))
+            temp.replace(path)
+        except OSError:
+            # a read-only data folder only costs the parsing
+            pass
+        return types
+
+    def _cache_path(self, manifest: bytes) -> Path:
+        try:
+            from importlib.metadata import version
+        except ImportError:
+            from importlib_metadata import version  # type: ignore
+
+        cache_dir = self.cache_dir
+        if cache_dir is None:
+            from ape.utils import ManagerAccessMixin
+
+            cache_dir = ManagerAccessMixin.config_manager.DATA_FOLDER / "llamapay"
+        versions = f"{version('ethpm-types')}-{version('pydantic')}"
+        key = hashlib.sha256(manifest + versions.encode()).hexdigest()[:16]
+        return Path(cache_dir) / f"contract_types-{key}.json"
+
+    def __getitem__(self, name: str) -> "ContractType":
+        return self._load()[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+
+CONTRACT_TYPES = ContractTypes()
 
 
 class FactoryDeployment(BaseModel):
-    ecosystem: str
-    network: str
+    chain_id: int
     address: str
-    deploy_block: int
+    # ape ecosystem and network names, used to connect to the chain in `search_networks`
+    ecosystem: Optional[str] = None
+    network: Optional[str] = None
+    # only a hint, the creation block is found from the contract code, see `Factory.deploy_block`
+    deploy_block: Optional[int] = None
 
     class Config:
         allow_mutation = False
 
 
-class Deplyoments(BaseModel):
+class Deployments(BaseModel):
+    """
+    Factory deployments by chain id. Entries added later take precedence, so a deployment
+    from `ape-config.yaml` overrides a built-in one on the same chain.
+    """
+
     __root__: List[FactoryDeployment]
 
-    def get(self, ecosystem, network):
-        return next(
-            item
-            for item in self.__root__
-            if item.ecosystem == ecosystem and item.network == network
-        )
+    def get(self, ecosystem: str, network: str) -> FactoryDeployment:
+        for item in reversed(self.__root__):
+            if item.ecosystem == ecosystem and item.network == network:
+                return item
+        raise UnsupportedNetwork(f"no llamapay deployment on {ecosystem}:{network}")
+
+    def by_chain_id(self, chain_id: int) -> FactoryDeployment:
+        for item in reversed(self.__root__):
+            if item.chain_id == chain_id:
+                return item
+        raise UnsupportedNetwork(f"no llamapay deployment on chain {chain_id}")
+
+    def add(self, deployment: FactoryDeployment):
+        self.__root__.append(deployment)
+
+    def with_config(self, path: Path) -> "Deployments":
+        """
+        A copy extended with the deployments from the `llamapay` section of an ape config:
+
+            llamapay:
+              deployments:
+                - chain_id: 31337
+                  address: "0x..."
+        """
+        if not path.exists():
+            return self
+
+        import yaml
 
+        config = yaml.safe_load(path.read_text()) or {}
+        items = (config.get("llamapay") or {}).get("deployments") or []
+        if not items:
+            return self
+        return Deployments(__root__=[*self.__root__, *map(FactoryDeployment.parse_obj, items)])
 
-FACTORY_DEPLOYMENTS = Deplyoments(
+
+# kept for backwards compatibility
+Deplyoments = Deployments
+
+
+FACTORY_DEPLOYMENTS = Deployments(
     __root__=[
         FactoryDeployment(
+            chain_id=1,
             ecosystem="ethereum",
             network="mainnet",
             address="0xde1C04855c2828431ba637675B6929A684f84C7F",
             deploy_block=14_676_643,
         ),
         FactoryDeployment(
+            chain_id=4,
             ecosystem="ethereum",
             network="rinkeby",
             address="0xde1C04855c2828431ba637675B6929A684f84C7F",
             deploy_block=10_582_060,
         ),
         FactoryDeployment(
+            chain_id=42,
             ecosystem="ethereum",
             network="kovan",
             address="0xD43bB75Cc924e8475dFF2604b962f39089e4f842",
             deploy_block=31_267_493,
         ),
         FactoryDeployment(
+            chain_id=10,
             ecosystem="optimism",
             network="mainnet",
             address="0xde1C04855c2828431ba637675B6929A684f84C7F",
-            # transaction index, TODO verify if it works as intended
             deploy_block=6_699_902,
         ),
         FactoryDeployment(
+            chain_id=42161,
             ecosystem="arbitrum",
             network="mainnet",
             address="0xde1C04855c2828431ba637675B6929A684f84C7F",
             deploy_block=10_785_890,
         ),
         FactoryDeployment(
+            chain_id=43114,
             ecosystem="avalanche",
             network="mainnet",
             address="0x7d507b4c2d7e54da5731f643506996da8525f4a3",
             deploy_block=13_948_155,
         ),
         FactoryDeployment(
+            chain_id=43113,
             ecosystem="avalanche",
             network="fuji",
             address="0xc4705f96030D347F421Fbe01d9A19F18B26a7d30",
             deploy_block=9_057_940,
         ),
         FactoryDeployment(
+            chain_id=250,
             ecosystem="fantom",
             network="opera",
             address="0xde1C04855c2828431ba637675B6929A684f84C7F",
             deploy_block=37_130_440,
         ),
         FactoryDeployment(
+            chain_id=137,
             ecosystem="polygon",
             network="mainnet",
             address="0xde1C04855c2828431ba637675B6929A684f84C7F",
             deploy_block=27_671_043,
         ),
         FactoryDeployment(
+            chain_id=56,
             ecosystem="bsc",
             network="mainnet",
             address="0xde1C04855c2828431ba637675B6929A684f84C7F",
@@ -95,6 +227,7 @@ FACTORY_DEPLOYMENTS = Deplyoments(
         ),
         FactoryDeployment(
             # provisional name, there is no gnosis chain / xdai plugin yet
+            chain_id=100,
             ecosystem="gnosis",
             network="mainnet",
             address="0xde1C04855c2828431ba637675B6929A684f84C7F",
@@ -115,3 +248,13 @@ DURATION_TO_SECONDS = {
 }
 
 PRECISION = 10**20
+
+# blocks near the head can be reorganized, they are not written to the on-disk index
+REORG_DEPTH = 128
+
+EIP712_DOMAIN_TYPEHASH = keccak(
+    text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
+)
+PERMIT_TYPEHASH = keccak(
+    text="Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)"
+)
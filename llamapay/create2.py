@@ -0,0 +1,47 @@
+import re
+from typing import Iterator
+
+from ape.types import AddressType
+from eth_utils import keccak, to_checksum_address
+
+# free memory pointer setup which starts solidity creation code, `PUSH1 0x80 PUSH1 0x40 MSTORE`
+CODE_START = re.compile(b"\x60[\x80\xa0\xc0\xe0]\x60\x40\x52")
+# cbor metadata which ends solidity code, the last two bytes are its length
+METADATA_START = re.compile(b"\xa2\x64ipfs|\xa1\x65bzzr|\xa2\x65bzzr")
+
+
+def create2_address(deployer: AddressType, salt: bytes, init_code_hash: bytes) -> AddressType:
+    """
+    Address of a contract created with CREATE2.
+    """
+    data = b"\xff" + bytes.fromhex(deployer[2:]) + salt + init_code_hash
+    return to_checksum_address(keccak(data)[12:])
+
+
+def token_salt(token: AddressType) -> bytes:
+    """
+    Salt of a pool, `bytes32(uint256(uint160(token)))` in `LlamaPayFactory`.
+    """
+    return bytes.fromhex(token[2:]).rjust(32, b"\x00")
+
+
+def init_code_candidates(code: bytes) -> Iterator[bytes]:
+    """
+    Hashes of the code fragments which could be creation code embedded in a deployer.
+
+    A contract which uses `new` carries the creation code of the created contract in its
+    own runtime code. It starts with the free memory pointer setup and ends with metadata,
+    the right fragment is found by comparing with an address the deployer reports.
+    """
+    ends = []
+    for match in METADATA_START.finditer(code):
+        # the length field follows the metadata, try every length which points back at it
+        for length in range(32, 128):
+            position = match.start() + length
+            if int.from_bytes(code[position : position + 2], "big") == length:
+                ends.append(position + 2)
+
+    for start in CODE_START.finditer(code):
+        for end in ends:
+            if end > start.start():
+                yield keccak(code[start.start() : end])
@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+from typing import Dict
+
+import numpy as np
+
+from llamapay.snapshot import Snapshot
+
+
+@dataclass
+class Projection:
+    """
+    Stream amounts at a given timestamp, in raw token values.
+    Arrays are aligned with `Snapshot.streams`, `None` marks streams which don't exist.
+    """
+
+    timestamp: int
+    withdrawable: np.ndarray
+    last_update: np.ndarray
+    owed: np.ndarray
+
+
+class Engine:
+    """
+    Off-chain replica of the LlamaPay accounting.
+
+    Takes a single `Snapshot` and projects every stream to any later timestamp without RPC calls.
+    Rates are uint216 and balances are scaled to 1e20, which overflows fixed-width integers,
+    so the arrays hold Python ints to match the contract to the last wei.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        columns = [
+            snapshot.stream_starts,
+            snapshot.balances,
+            snapshot.last_payer_update,
+            snapshot.total_paid_per_sec,
+        ]
+        if any(None in column for column in columns):
+            raise ValueError("snapshot is incomplete")
+
+        self.snapshot = snapshot
+        payer_index: Dict[str, int] = {payer: i for i, payer in enumerate(snapshot.payers)}
+        try:
+            self._payer_of_stream = np.array(
+                [payer_index[stream.source] for stream in snapshot.streams], dtype=np.int64
+            )
+        except KeyError as e:
+            raise ValueError(f"payer {e} is missing from the snapshot")
+
+        self.rates = _column([stream.rate for stream in snapshot.streams])
+        self.stream_starts = _column(snapshot.stream_starts)
+        self.balances = _column(snapshot.balances)
+        self.last_payer_update = _column(snapshot.last_payer_update)
+        self.total_paid_per_sec = _column(snapshot.total_paid_per_sec)
+
+    def at(self, timestamp: int) -> Projection:
+        """
+        Mirrors `LlamaPay.withdrawable` for every stream at a timestamp.
+        """
+        if timestamp < self.snapshot.timestamp:
+            raise ValueError("can only project forward from the snapshot")
+
+        payers = self._payer_of_stream
+        balance = self.balances[payers]
+        last_payer_update = self.last_payer_update[payers]
+        paid_per_sec = self.total_paid_per_sec[payers]
+
+        total_payer_payment = (timestamp - last_payer_update) * paid_per_sec
+        # a payer with a zero rate is always solvent, the division is only there for numpy
+        time_paid = balance // np.where(paid_per_sec == 0, 1, paid_per_sec)
+        last_update = np.where(
+            balance >= total_payer_payment, timestamp, last_payer_update + time_paid
+        )
+        divisor = self.snapshot.internal_scale
+        withdrawable = (last_update - self.stream_starts) * self.rates // divisor
+        owed = (timestamp - last_update) * self.rates // divisor
+
+        exists = self.stream_starts != 0
+        return Projection(
+            timestamp=timestamp,
+            withdrawable=np.where(exists, withdrawable, None),
+            last_update=np.where(exists, last_update, None),
+            owed=np.where(exists, owed, None),
+        )
+
+    def insolvency_time(self) -> np.ndarray:
+        """
+        Timestamp at which each payer runs out of funds, `None` for payers without streams.
+        Aligned with `Snapshot.payers`.
+        """
+        paid_per_sec = self.total_paid_per_sec
+        has_streams = paid_per_sec != 0
+        runway = self.balances // np.where(has_streams, paid_per_sec, 1)
+        return np.where(has_streams, self.last_payer_update + runway, None)
+
+
+def _column(values) -> np.ndarray:
+    column = np.empty(len(values), dtype=object)
+    column[:] = [int(value) for value in values]
+    return column
@@ -1,2 +1,10 @@
 class PoolNotDeployed(Exception):
     pass
+
+
+class UnsupportedNetwork(Exception):
+    pass
+
+
+class CallFailed(Exception):
+    pass
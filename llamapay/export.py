@@ -0,0 +1,228 @@
+import csv
+import json
+from decimal import Decimal
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+from ape.types import ContractLog
+from ape.utils import ManagerAccessMixin
+
+from llamapay.constants import PRECISION, REORG_DEPTH
+
+if TYPE_CHECKING:
+    from llamapay.llamapay import Factory, Pool
+
+COLUMNS = [
+    "chain_id",
+    "pool",
+    "token",
+    "block_number",
+    "timestamp",
+    "transaction_hash",
+    "log_index",
+    "event",
+    "payer",
+    "payee",
+    "amount_per_sec",
+    "stream_id",
+    "old_payee",
+    "old_amount_per_sec",
+    "old_stream_id",
+    "reason",
+    "amount",
+    "token_amount",
+    "tokens_per_sec",
+]
+
+# event argument -> column, `StreamModified` maps the new stream to the regular columns
+ARGUMENT_COLUMNS = {
+    "from": "payer",
+    "to": "payee",
+    "amountPerSec": "amount_per_sec",
+    "streamId": "stream_id",
+    "newStreamId": "stream_id",
+    "oldTo": "old_payee",
+    "oldAmountPerSec": "old_amount_per_sec",
+    "oldStreamId": "old_stream_id",
+    "reason": "reason",
+    "amount": "amount",
+}
+
+FORMATS = ["csv", "parquet"]
+
+
+class Exporter(ManagerAccessMixin):
+    """
+    Export pool events into one table per pool, picking up where the last export stopped.
+
+    Raw integer values are kept as strings, since rates don't fit into 64 bits, next to
+    amounts scaled to tokens. Only blocks deeper than `REORG_DEPTH` are exported, so a rerun
+    never has to take rows back. Progress is kept in `state.json` in the output directory,
+    rows written after the last saved state, e.g. by a crashed run, are removed on resume.
+    Block timestamps come from the factory, so the ones it has stored aren't fetched again.
+
+    >>> Exporter('exports', format='parquet').export(factory)
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        format: str = "csv",
+        batch_size: int = 10_000,
+    ):
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}")
+        if format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("parquet export needs pyarrow, `pip install llamapay[export]`")
+
+        self.directory = Path(directory)
+        self.format = format
+        self.batch_size = batch_size
+        self.state_path = self.directory / "state.json"
+        # last exported block of each pool and the size of its csv file at that point
+        self.state: Dict[str, Dict[str, int]] = {}
+        if self.state_path.exists():
+            self.state = json.loads(self.state_path.read_text())
+
+    def export(self, factory: "Factory", stop: Optional[int] = None) -> Dict["Pool", int]:
+        """
+        Export every pool of a factory, returns the number of new rows in each.
+        """
+        if stop is None:
+            stop = self.chain_manager.blocks.height - REORG_DEPTH
+        return {pool: self.export_pool(pool, stop=stop) for pool in factory.pools}
+
+    def export_pool(self, pool: "Pool", stop: Optional[int] = None) -> int:
+        """
+        Export new events of a pool up to `stop` block, returns the number of rows written.
+        """
+        if stop is None:
+            stop = self.chain_manager.blocks.height - REORG_DEPTH
+        key = f"{pool.factory.chain_id}:{pool.address}"
+        self._rewind(pool, key)
+        start = self.state.get(key, {}).get("block", pool.factory.deploy_block - 1) + 1
+        if start > stop:
+            return 0
+
+        written = 0
+        logs: List[ContractLog] = []
+        for log in pool.iter_logs(start=start, stop=stop):
+            # row groups end on a block boundary, so the state never splits a block
+            if len(logs) >= self.batch_size and log.block_number != logs[-1].block_number:
+                written += self._write(pool, logs)
+                self._save_state(pool, key, logs[-1].block_number)
+                logs = []
+            logs.append(log)
+
+        written += self._write(pool, logs)
+        self._save_state(pool, key, stop)
+        return written
+
+    def _rewind(self, pool: "Pool", key: str):
+        """
+        Remove rows written after the saved state, so a rerun doesn't write them twice.
+        """
+        state = self.state.get(key, {})
+        if self.format == "csv":
+            path = self._csv_path(pool)
+            size = state.get("size", 0)
+            if path.exists() and path.stat().st_size > size:
+                with path.open("r+b") as f:
+                    f.truncate(size)
+        elif self._path(pool).is_dir():
+            last_block = state.get("block", -1)
+            for part in self._path(pool).glob("*.parquet"):
+                if int(part.name.split("-")[0]) > last_block:
+                    part.unlink()
+
+    def _rows(self, pool: "Pool", logs: List[ContractLog]) -> List[Dict[str, Any]]:
+        timestamps = pool.factory.timestamps.get_many(log.block_number for log in logs)
+        rows = []
+        for log in logs:
+            row: Dict[str, Any] = dict.fromkeys(COLUMNS)
+            row.update(
+                chain_id=pool.factory.chain_id,
+                pool=pool.address,
+                token=pool.symbol,
+                block_number=log.block_number,
+                timestamp=timestamps[log.block_number],
+                transaction_hash=_hex(log.transaction_hash),
+                log_index=log.log_index,
+                event=log.name,
+            )
+            for name, value in log.event_arguments.items():
+                column = ARGUMENT_COLUMNS[name]
+                row[column] = _hex(value) if isinstance(value, bytes) else value
+            if row["amount"] is not None:
+                row["token_amount"] = str(Decimal(row["amount"]) / pool.scale)
+            if row["amount_per_sec"] is not None:
+                row["tokens_per_sec"] = str(Decimal(row["amount_per_sec"]) / PRECISION)
+            for column in ["amount", "amount_per_sec", "old_amount_per_sec"]:
+                if row[column] is not None:
+                    row[column] = str(row[column])
+            rows.append(row)
+
+        return rows
+
+    def _path(self, pool: "Pool") -> Path:
+        return self.directory / str(pool.factory.chain_id) / f"{pool.symbol}-{pool.address}"
+
+    def _csv_path(self, pool: "Pool") -> Path:
+        path = self._path(pool)
+        return path.parent / f"{path.name}.csv"
+
+    def _write(self, pool: "Pool", logs: List[ContractLog]) -> int:
+        if not logs:
+            return 0
+        rows = self._rows(pool, logs)
+        path = self._path(pool)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self.format == "csv":
+            path = self._csv_path(pool)
+            new = not path.exists() or path.stat().st_size == 0
+            with path.open("a", newline="") as f:
+                writer = csv.DictWriter(f, COLUMNS)
+                if new:
+                    writer.writeheader()
+                writer.writerows(rows)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            # parquet files can't be appended to, each row group is a part named by its blocks
+            path.mkdir(exist_ok=True)
+            part = path / f"{logs[0].block_number:012d}-{logs[-1].block_number:012d}.parquet"
+            table = pa.Table.from_pylist(rows, schema=_schema())
+            # a crash leaves a temporary file behind instead of a broken part
+            temp = part.with_suffix(".tmp")
+            pq.write_table(table, temp)
+            temp.replace(part)
+
+        return len(rows)
+
+    def _save_state(self, pool: "Pool", key: str, block: int):
+        self.state[key] = {"block": block}
+        if self.format == "csv" and self._csv_path(pool).exists():
+            self.state[key]["size"] = self._csv_path(pool).stat().st_size
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp = self.state_path.with_suffix(".tmp")
+        temp.write_text(json.dumps(self.state, indent=2))
+        temp.replace(self.state_path)
+
+
+def _schema():
+    import pyarrow as pa
+
+    integers = {"chain_id", "block_number", "timestamp", "log_index"}
+    return pa.schema(
+        [(column, pa.int64() if column in integers else pa.string()) for column in COLUMNS]
+    )
+
+
+def _hex(value) -> str:
+    if isinstance(value, bytes):
+        return "0x" + value.hex()
+    return str(value)
@@ -0,0 +1,242 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from ape.types import AddressType, ContractLog
+
+from llamapay.constants import REORG_DEPTH
+from llamapay.index import STREAM_EVENTS
+
+if TYPE_CHECKING:
+    from llamapay.llamapay import Pool, Stream
+
+Timestamp = Union[int, datetime]
+
+
+@dataclass
+class Accrual:
+    """
+    What a stream accrued over a period, at its rate, whether or not the payer could cover it.
+    """
+
+    stream: "Stream"
+    seconds: int
+    # raw token amount
+    amount: int
+
+    @property
+    def tokens(self) -> Decimal:
+        return Decimal(self.amount) / self.stream.pool.scale
+
+
+class StreamHistory:
+    """
+    Intervals during which each stream in a pool was active, built incrementally from events.
+
+    Every `checkpoint_every` events the active set is saved, so a point-in-time lookup
+    replays at most that many events from the nearest checkpoint. Events are kept in block
+    order together with their timestamps, so dates are found with a binary search.
+    """
+
+    def __init__(self, pool: "Pool", checkpoint_every: int = 1000):
+        self.pool = pool
+        self.checkpoint_every = checkpoint_every
+        # one row per interval of activity
+        self.ids: List[bytes] = []
+        self.sources: List[AddressType] = []
+        self.targets: List[AddressType] = []
+        self.rates: List[int] = []
+        self.start_blocks: List[int] = []
+        self.start_times: List[int] = []
+        self.end_blocks: List[Optional[int]] = []
+        self.end_times: List[Optional[int]] = []
+        # events in block order, an interval number opens and its complement (~n) closes
+        self._blocks: List[int] = []
+        self._times: List[int] = []
+        self._changes: List[int] = []
+        # active set before every `checkpoint_every`-th event
+        self._checkpoints: List[FrozenSet[int]] = []
+        self._open: Dict[bytes, int] = {}
+        self.last_block = pool.factory.deploy_block - 1
+        # state before the blocks which could still be reorganized, restored on every update
+        self._tail: Optional[Tuple[int, int, int, Dict[bytes, int]]] = None
+
+    def update(self):
+        """
+        Add the events since the last update.
+
+        Blocks deeper than `REORG_DEPTH` are kept for good. The ones above them, up to the
+        pool's confirmations, are dropped and fetched again on every update, so a reorganized
+        block can't leave a stale interval behind.
+        """
+        self._drop_tail()
+        height = self.pool.chain_manager.blocks.height
+        self._extend(height - REORG_DEPTH)
+        self._tail = (self.last_block, len(self.ids), len(self._changes), dict(self._open))
+        self._extend(height - self.pool.confirmations)
+
+    def _extend(self, stop: int):
+        if stop <= self.last_block:
+            return
+        start = self.last_block + 1
+        logs = list(self.pool.iter_logs(start=start, stop=stop, events=STREAM_EVENTS))
+        timestamps = self.pool.factory.timestamps.get_many(log.block_number for log in logs)
+        for log in logs:
+            self.apply(log, timestamps[log.block_number])
+        self.last_block = stop
+
+    def _drop_tail(self):
+        if self._tail is None:
+            return
+        self.last_block, intervals, changes, self._open = self._tail
+        self._tail = None
+        for column in [
+            self.ids,
+            self.sources,
+            self.targets,
+            self.rates,
+            self.start_blocks,
+            self.start_times,
+            self.end_blocks,
+            self.end_times,
+        ]:
+            del column[intervals:]
+        del self._blocks[changes:]
+        del self._times[changes:]
+        del self._changes[changes:]
+        # a checkpoint is taken before every `checkpoint_every`-th change
+        del self._checkpoints[-(-changes // self.checkpoint_every) :]
+        # intervals closed in the dropped blocks are open again
+        for interval in self._open.values():
+            self.end_blocks[interval] = None
+            self.end_times[interval] = None
+
+    def apply(self, log: ContractLog, timestamp: int):
+        args = log.event_arguments
+        if log.name in ["StreamCreated", "StreamCreatedWithReason"]:
+            self._start(args["streamId"], args, args["to"], args["amountPerSec"], log, timestamp)
+        elif log.name in ["StreamCancelled", "StreamPaused"]:
+            self._stop(args["streamId"], log, timestamp)
+        elif log.name == "StreamModified":
+            self._stop(args["oldStreamId"], log, timestamp)
+            self._start(args["newStreamId"], args, args["to"], args["amountPerSec"], log, timestamp)
+
+    def _record(self, change: int, log: ContractLog, timestamp: int):
+        if len(self._changes) % self.checkpoint_every == 0:
+            self._checkpoints.append(frozenset(self._open.values()))
+        self._blocks.append(log.block_number)
+        self._times.append(timestamp)
+        self._changes.append(change)
+
+    def _start(self, stream_id, args: dict, target, rate, log: ContractLog, timestamp: int):
+        stream_id = bytes(stream_id)
+        if stream_id in self._open:
+            return
+        interval = len(self.ids)
+        self.ids.append(stream_id)
+        self.sources.append(args["from"])
+        self.targets.append(target)
+        self.rates.append(rate)
+        self.start_blocks.append(log.block_number)
+        self.start_times.append(timestamp)
+        self.end_blocks.append(None)
+        self.end_times.append(None)
+        self._record(interval, log, timestamp)
+        self._open[stream_id] = interval
+
+    def _stop(self, stream_id, log: ContractLog, timestamp: int):
+        stream_id = bytes(stream_id)
+        if stream_id not in self._open:
+            return
+        # checkpoints are taken before an event changes the active set
+        self._record(~self._open[stream_id], log, timestamp)
+        interval = self._open.pop(stream_id)
+        self.end_blocks[interval] = log.block_number
+        self.end_times[interval] = timestamp
+
+    def active_at(
+        self, block: Optional[int] = None, timestamp: Optional[Timestamp] = None
+    ) -> Set[int]:
+        """
+        Intervals active after all events at a block or a timestamp.
+        """
+        if timestamp is not None:
+            position = bisect_right(self._times, to_timestamp(timestamp))
+        elif block is not None:
+            position = bisect_right(self._blocks, block)
+        else:
+            position = len(self._changes)
+        if not self._checkpoints:
+            return set()
+
+        checkpoint = min(position // self.checkpoint_every, len(self._checkpoints) - 1)
+        active = set(self._checkpoints[checkpoint])
+        for change in self._changes[checkpoint * self.checkpoint_every : position]:
+            if change >= 0:
+                active.add(change)
+            else:
+                active.discard(~change)
+        return active
+
+    def stream(self, interval: int) -> "Stream":
+        from llamapay.llamapay import Stream
+
+        return Stream.trusted(
+            self.sources[interval], self.targets[interval], self.rates[interval], self.pool
+        )
+
+    def streams_at(
+        self, block: Optional[int] = None, timestamp: Optional[Timestamp] = None
+    ) -> List["Stream"]:
+        return [self.stream(interval) for interval in sorted(self.active_at(block, timestamp))]
+
+    def accrued_between(self, start: Timestamp, end: Timestamp) -> List[Accrual]:
+        """
+        Amount each stream accrued between two timestamps, streams which accrued nothing
+        are left out. Intervals of a paused and resumed stream are added up.
+        """
+        start, end = to_timestamp(start), to_timestamp(end)
+        if not self.ids:
+            return []
+        starts = np.array(self.start_times, dtype=np.int64)
+        ends = np.array([end if value is None else value for value in self.end_times], np.int64)
+        seconds = np.clip(np.minimum(ends, end) - np.maximum(starts, start), 0, None)
+
+        totals: Dict[bytes, List[int]] = {}
+        for interval in np.flatnonzero(seconds):
+            # scaled per interval like a withdrawal, so amounts stay in exact integers
+            duration = int(seconds[interval])
+            amount = duration * self.rates[interval] // self.pool.internal_scale
+            total = totals.setdefault(self.ids[interval], [int(interval), 0, 0])
+            total[1] += duration
+            total[2] += amount
+
+        return [
+            Accrual(stream=self.stream(interval), seconds=duration, amount=amount)
+            for interval, duration, amount in totals.values()
+        ]
+
+
+def by_payer(accruals: List[Accrual]) -> Dict[AddressType, int]:
+    """
+    Raw amounts owed by each payer.
+    """
+    owed: Dict[AddressType, int] = {}
+    for accrual in accruals:
+        source = accrual.stream.source
+        owed[source] = owed.get(source, 0) + accrual.amount
+    return owed
+
+
+def to_timestamp(value: Timestamp) -> int:
+    """
+    Unix timestamp of a datetime, naive datetimes are taken as UTC.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return int(value)
@@ -0,0 +1,224 @@
+from array import array
+from collections import defaultdict, deque
+from enum import Enum
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Set, Tuple
+
+from ape.types import AddressType, ContractLog
+
+if TYPE_CHECKING:
+    from llamapay.llamapay import Pool, Stream
+
+
+class StreamStatus(Enum):
+    ACTIVE = "active"
+    PAUSED = "paused"
+    CANCELLED = "cancelled"
+
+
+# events which change the state of a stream, all of them have `from` as the first topic
+STREAM_EVENTS = [
+    "StreamCreated",
+    "StreamCreatedWithReason",
+    "StreamCancelled",
+    "StreamPaused",
+    "StreamModified",
+]
+
+STATUSES = list(StreamStatus)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+
+class StreamTable:
+    """
+    Column-oriented storage of streams, one row per stream id.
+
+    Addresses are dictionary-encoded, each distinct address is stored once and rows refer to it
+    by number. Rates are uint216 and don't fit into fixed-width arrays, so they stay Python ints.
+    Values are trusted to be checksummed already, nothing is converted on insert.
+    """
+
+    def __init__(self):
+        self.ids: List[bytes] = []
+        self.sources = array("I")
+        self.targets = array("I")
+        self.rates: List[int] = []
+        self.statuses = array("B")
+        self.addresses: List[AddressType] = []
+        self._address_codes: Dict[AddressType, int] = {}
+        self._rows: Dict[bytes, int] = {}
+
+    def _encode_address(self, address: AddressType) -> int:
+        code = self._address_codes.get(address)
+        if code is None:
+            code = self._address_codes[address] = len(self.addresses)
+            self.addresses.append(address)
+        return code
+
+    def upsert(
+        self, stream_id: bytes, source: AddressType, target: AddressType, rate: int, status: int
+    ) -> int:
+        """
+        Insert a stream or update the status of a known one, returns the row number.
+        """
+        row = self._rows.get(stream_id)
+        if row is None:
+            row = self._rows[stream_id] = len(self.ids)
+            self.ids.append(stream_id)
+            self.sources.append(self._encode_address(source))
+            self.targets.append(self._encode_address(target))
+            self.rates.append(rate)
+            self.statuses.append(status)
+        else:
+            self.statuses[row] = status
+        return row
+
+    def pop(self):
+        """
+        Remove the last inserted row.
+        """
+        del self._rows[self.ids.pop()]
+        self.sources.pop()
+        self.targets.pop()
+        self.rates.pop()
+        self.statuses.pop()
+
+    def row(self, stream_id: bytes) -> Optional[int]:
+        return self._rows.get(stream_id)
+
+    def source(self, row: int) -> AddressType:
+        return self.addresses[self.sources[row]]
+
+    def target(self, row: int) -> AddressType:
+        return self.addresses[self.targets[row]]
+
+    def status(self, row: int) -> StreamStatus:
+        return STATUSES[self.statuses[row]]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class StreamIndex:
+    """
+    Event-sourced state of all streams in a pool, keyed by stream id.
+
+    Keeps hash indexes by source and target, so lookups don't depend on the pool size.
+    `Stream` objects are only created for the rows a lookup returns.
+
+    Changes applied with `journal=True` can be undone with `rollback`, which is used
+    to handle chain reorganizations.
+    """
+
+    def __init__(self, pool: "Pool"):
+        self.pool = pool
+        self.table = StreamTable()
+        self._by_source: Dict[AddressType, Set[int]] = defaultdict(set)
+        self._by_target: Dict[AddressType, Set[int]] = defaultdict(set)
+        # (block number, row, previous status code or None if the row was inserted)
+        self._journal: Deque[Tuple[int, int, Optional[int]]] = deque()
+        self._block: Optional[int] = None
+
+    def apply(self, log: ContractLog, journal: bool = False):
+        """
+        Advance the state machine with a decoded pool event.
+        """
+        self._block = log.block_number if journal else None
+        args = log.event_arguments
+        if log.name in ["StreamCreated", "StreamCreatedWithReason"]:
+            self._set(args, "streamId", args["to"], args["amountPerSec"], StreamStatus.ACTIVE)
+        elif log.name == "StreamCancelled":
+            self._set(args, "streamId", args["to"], args["amountPerSec"], StreamStatus.CANCELLED)
+        elif log.name == "StreamPaused":
+            self._set(args, "streamId", args["to"], args["amountPerSec"], StreamStatus.PAUSED)
+        elif log.name == "StreamModified":
+            # modifying cancels the old stream and creates a new one in the same transaction
+            self._set(
+                args, "oldStreamId", args["oldTo"], args["oldAmountPerSec"], StreamStatus.CANCELLED
+            )
+            self._set(args, "newStreamId", args["to"], args["amountPerSec"], StreamStatus.ACTIVE)
+
+    def _set(self, args: dict, id_field: str, target, rate, status: StreamStatus):
+        stream_id = bytes(args[id_field])
+        known = len(self.table)
+        existing = self.table.row(stream_id)
+        previous = None if existing is None else self.table.statuses[existing]
+        row = self.table.upsert(stream_id, args["from"], target, rate, STATUS_CODES[status])
+        if row == known:
+            self._by_source[args["from"]].add(row)
+            self._by_target[target].add(row)
+        if self._block is not None:
+            self._journal.append((self._block, row, previous))
+
+    def rollback(self, block: int):
+        """
+        Undo journaled changes from `block` onwards.
+        """
+        table = self.table
+        while self._journal and self._journal[-1][0] >= block:
+            _, row, previous = self._journal.pop()
+            if previous is not None:
+                table.statuses[row] = previous
+                continue
+            # inserted rows are always the last ones when undoing in reverse
+            self._by_source[table.source(row)].discard(row)
+            self._by_target[table.target(row)].discard(row)
+            table.pop()
+
+    def prune(self, block: int):
+        """
+        Forget journaled changes before `block`, they can no longer be rolled back.
+        """
+        while self._journal and self._journal[0][0] < block:
+            self._journal.popleft()
+
+    def stream(self, row: int) -> "Stream":
+        from llamapay.llamapay import Stream
+
+        table = self.table
+        return Stream.trusted(table.source(row), table.target(row), table.rates[row], self.pool)
+
+    def get(self, stream_id: bytes) -> Optional["Stream"]:
+        row = self.table.row(bytes(stream_id))
+        return None if row is None else self.stream(row)
+
+    def status(self, stream_id: bytes) -> Optional[StreamStatus]:
+        row = self.table.row(bytes(stream_id))
+        return None if row is None else self.table.status(row)
+
+    def find_rows(
+        self,
+        *,
+        source: Optional[AddressType] = None,
+        target: Optional[AddressType] = None,
+        status: Optional[StreamStatus] = StreamStatus.ACTIVE,
+    ) -> List[int]:
+        if source and target:
+            rows = self._by_source.get(source, set()) & self._by_target.get(target, set())
+        elif source:
+            rows = self._by_source.get(source, set())
+        elif target:
+            rows = self._by_target.get(target, set())
+        else:
+            rows = range(len(self.table))  # type: ignore
+
+        if status is None:
+            return sorted(rows)
+        code = STATUS_CODES[status]
+        statuses = self.table.statuses
+        return sorted(row for row in rows if statuses[row] == code)
+
+    def find(
+        self,
+        *,
+        source: Optional[AddressType] = None,
+        target: Optional[AddressType] = None,
+        status: Optional[StreamStatus] = StreamStatus.ACTIVE,
+    ) -> List["Stream"]:
+        """
+        Find streams by source and/or target. Pass `status=None` to include every status.
+        """
+        rows = self.find_rows(source=source, target=target, status=status)
+        return [self.stream(row) for row in rows]
+
+    def __len__(self) -> int:
+        return len(self.table)
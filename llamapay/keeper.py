@@ -0,0 +1,155 @@
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+from ape.api import ReceiptAPI
+from ape.logging import logger
+from ape.types import AddressType
+
+from llamapay.batch import Batch
+from llamapay.solvency import convert_duration
+
+if TYPE_CHECKING:
+    from llamapay.llamapay import Pool, Stream
+
+Amount = Union[int, Decimal, str]
+
+
+@dataclass
+class KeeperReport:
+    """
+    Outcome of one keeper cycle.
+    """
+
+    sent: List["Stream"] = field(default_factory=list)
+    skipped: List["Stream"] = field(default_factory=list)
+    failed: List["Stream"] = field(default_factory=list)
+    receipts: List[ReceiptAPI] = field(default_factory=list)
+
+    def __str__(self):
+        return f"sent={len(self.sent)} skipped={len(self.skipped)} failed={len(self.failed)}"
+
+
+class Keeper:
+    """
+    Push withdrawable balances to recipients when they are worth it.
+
+    Each cycle reads all active streams of every pool in one snapshot and sends the streams
+    above the threshold of their token, or not paid out for longer than `max_age`,
+    in gas-capped `LlamaPay.batch` transactions.
+
+    >>> keeper = Keeper(factory.pools, thresholds={'DAI': '100 DAI'}, max_age='week', sender=dev)
+    >>> keeper.run_once()
+    """
+
+    def __init__(
+        self,
+        pools: List["Pool"],
+        thresholds: Optional[Dict[str, Amount]] = None,
+        default_threshold: Optional[Amount] = None,
+        max_age: Optional[Union[int, str]] = None,
+        sources: Optional[List[AddressType]] = None,
+        gas_limit: int = 10_000_000,
+        chunk_size: int = 500,
+        **tx_args,
+    ):
+        """
+        Arguments:
+            pools: pools to keep
+            thresholds: minimum withdrawable amount by token symbol or address
+            default_threshold: minimum amount for tokens without their own threshold,
+                streams of such tokens are only sent because of their age if not set
+            max_age: send any positive balance not paid out for this many seconds
+                or a duration like `2 weeks`
+            sources: only keep streams paid by these addresses [default: all streams]
+            gas_limit: gas budget of each batch transaction
+            chunk_size: number of calls per multicall request
+        """
+        self.pools = pools
+        self.thresholds = thresholds or {}
+        self.default_threshold = default_threshold
+        self.max_age = None if max_age is None else convert_duration(max_age)
+        self.sources = sources
+        self.gas_limit = gas_limit
+        self.chunk_size = chunk_size
+        self.tx_args = tx_args
+
+    def threshold(self, pool: "Pool") -> Optional[int]:
+        """
+        Raw token threshold of a pool, or None if only the age counts.
+        """
+        for key in [pool.symbol, pool.token.address]:
+            if key in self.thresholds:
+                return pool._convert_amount(self.thresholds[key])
+        if self.default_threshold is None:
+            return None
+        return pool._convert_amount(self.default_threshold)
+
+    def due(self, pool: "Pool") -> KeeperReport:
+        """
+        Split active streams of a pool into the ones to send and the ones to skip.
+        """
+        report = KeeperReport()
+        threshold = self.threshold(pool)
+        streams = None
+        if self.sources is not None:
+            streams = [
+                stream for source in self.sources for stream in pool.find_streams(source=source)
+            ]
+        # payer state isn't needed, only the streams are read
+        snapshot = pool.snapshot(streams=streams, payers=[], chunk_size=self.chunk_size)
+        for stream, amount, start in zip(
+            snapshot.streams, snapshot.withdrawable, snapshot.stream_starts
+        ):
+            if not amount:
+                report.skipped.append(stream)
+            elif threshold is not None and amount >= threshold:
+                report.sent.append(stream)
+            elif self.max_age and start and snapshot.timestamp - start >= self.max_age:
+                report.sent.append(stream)
+            else:
+                report.skipped.append(stream)
+
+        return report
+
+    def run_once(self) -> KeeperReport:
+        """
+        Run a single cycle over all pools.
+        """
+        report = KeeperReport()
+        for pool in self.pools:
+            due = self.due(pool)
+            report.skipped.extend(due.skipped)
+            if not due.sent:
+                continue
+
+            batch = Batch(pool, gas_limit=self.gas_limit, **self.tx_args)
+            for stream in due.sent:
+                batch.send(stream)
+            try:
+                batch.execute()
+            except Exception as error:
+                logger.error(f"{pool}: batch failed: {error}")
+
+            # streams after a failed transaction have no result
+            succeeded = {id(result.stream) for result in batch.results if result.success}
+            for stream in due.sent:
+                (report.sent if id(stream) in succeeded else report.failed).append(stream)
+            receipts = {id(result.receipt): result.receipt for result in batch.results}
+            report.receipts.extend(receipts.values())
+
+        logger.info(f"keeper: {report}")
+        return report
+
+    def run(self, interval: float = 3600):
+        """
+        Run cycles forever, `interval` seconds apart.
+        """
+        while True:
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception as error:
+                logger.error(f"keeper cycle failed: {error}")
+            time.sleep(max(0, interval - (time.monotonic() - started)))
@@ -1,18 +1,41 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from decimal import Decimal
 from functools import cached_property
-from typing import List, Optional, Union
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from ape.api import ReceiptAPI
+from ape.logging import logger
 from ape.types import AddressType, ContractLog
 from ape.utils import ManagerAccessMixin
-from ape_tokens import tokens
-from ape_tokens.managers import ERC20
+from eth_abi import encode_abi
 from eth_abi.packed import encode_abi_packed
-from eth_utils import keccak
+from eth_account.messages import encode_structured_data
+from eth_utils import is_checksum_address, keccak
 
-from llamapay.constants import CONTRACT_TYPES, DURATION_TO_SECONDS, FACTORY_DEPLOYMENTS, PRECISION
-from llamapay.exceptions import PoolNotDeployed
+from llamapay.batch import Batch
+from llamapay.blocks import BlockTimestamps, find_deploy_block
+from llamapay.cache import ADDRESSES, INIT_CODE_HASHES, TOKEN_METADATA, TOKENS
+from llamapay.constants import (
+    CONTRACT_TYPES,
+    DURATION_TO_SECONDS,
+    EIP712_DOMAIN_TYPEHASH,
+    FACTORY_DEPLOYMENTS,
+    PERMIT_TYPEHASH,
+    PRECISION,
+    REORG_DEPTH,
+)
+from llamapay.create2 import create2_address, init_code_candidates, token_salt
+from llamapay.exceptions import CallFailed, PoolNotDeployed, UnsupportedNetwork
+from llamapay.history import Accrual, StreamHistory, Timestamp
+from llamapay.index import STREAM_EVENTS, StreamIndex, StreamStatus
+from llamapay.logs import LogFetcher, Page, address_topic
+from llamapay.multicall import Call, Multicall
+from llamapay.snapshot import Snapshot
+from llamapay.solvency import PayerSolvency, payer_solvency, within
+from llamapay.store import LogStore
+from llamapay.watch import StreamEvent, Watcher
 
 
 class Factory(ManagerAccessMixin):
@@ -21,25 +44,198 @@ class Factory(ManagerAccessMixin):
     This factory helps discover and deploy new pools.
     """
 
-    def __init__(self):
-        self.deployment = FACTORY_DEPLOYMENTS.get(
-            ecosystem=self.provider.network.ecosystem.name,
-            network=self.provider.network.name.replace("-fork", ""),
+    def __init__(self, store: Optional[LogStore] = None, keep_logs: bool = True):
+        self.chain_id = self.provider.chain_id
+        deployments = FACTORY_DEPLOYMENTS.with_config(
+            self.config_manager.PROJECT_FOLDER / "ape-config.yaml"
         )
-        self.contract = self.create_contract(
-            self.deployment.address, CONTRACT_TYPES["LlamaPayFactory"]
+        self.deployment = deployments.by_chain_id(self.chain_id)
+        self.store = store or LogStore(self.config_manager.DATA_FOLDER / "llamapay" / "events.db")
+        # forks and local chains share a chain id with the real network, don't pollute its index
+        network = self.provider.network.name
+        self.persist = not (network.endswith("-fork") or network == "local")
+        # fork blocks past the fork point have the numbers but not the timestamps of upstream
+        timestamps_store = None if network.endswith("-fork") else self.store
+        self.timestamps = BlockTimestamps(store=timestamps_store, save=self.persist)
+        # raw logs are only needed for `Pool._logs`, the stream index is always kept
+        self.keep_logs = keep_logs
+        # identity map, so each pool keeps its stream index for the lifetime of the factory
+        self._pools: Dict[AddressType, Pool] = {}
+        self._pool_by_token: Dict[AddressType, AddressType] = {}
+        # pool addresses of tokens looked up before, deployed or not
+        self._pool_addresses: Dict[AddressType, AddressType] = {}
+        self._pools_lock = threading.RLock()
+
+    @cached_property
+    def contract(self):
+        return self.create_contract(self.deployment.address, CONTRACT_TYPES["LlamaPayFactory"])
+
+    @cached_property
+    def fork_block(self) -> Optional[int]:
+        """
+        Upstream block a forked network split off at, None on other networks.
+
+        The on-disk index belongs to the upstream chain, so a fork can only use it up to here.
+        """
+        if not self.provider.network.name.endswith("-fork"):
+            return None
+        queries = [
+            ("anvil_nodeInfo", ["forkConfig", "forkBlockNumber"]),
+            ("hardhat_metadata", ["forkedNetwork", "forkBlockNumber"]),
+        ]
+        for method, path in queries:
+            try:
+                result = self.provider._make_request(method, [])
+            except Exception:
+                continue
+            for key in path:
+                result = result.get(key) if isinstance(result, dict) else None
+            if result is not None:
+                return int(result, 0) if isinstance(result, str) else int(result)
+
+        # the fork point is unknown, so none of the index can be trusted
+        return -1
+
+    def store_limit(self, head: int) -> int:
+        """
+        Last block of the on-disk index which is valid on the connected chain.
+        """
+        if self.fork_block is None:
+            return head
+        return min(head, self.fork_block)
+
+    @cached_property
+    def deploy_block(self) -> int:
+        """
+        Block the factory was created in, found from its code and kept in the store.
+        """
+        address = self.deployment.address
+        block = self.store.get_deploy_block(self.chain_id, address) if self.persist else None
+        if block is not None:
+            return block
+        try:
+            block = find_deploy_block(address, hint=self.deployment.deploy_block)
+        except UnsupportedNetwork:
+            raise
+        except Exception as error:
+            # nodes without historical state can't answer, trust the hint then
+            if self.deployment.deploy_block is None:
+                raise
+            logger.warning(f"can't find the factory deploy block, using the hint: {error}")
+            return self.deployment.deploy_block
+
+        if self.persist:
+            self.store.save_deploy_block(self.chain_id, address, block)
+        return block
+
+    @property
+    def init_code_hash(self) -> Optional[bytes]:
+        """
+        Hash of the pool creation code, or None if it couldn't be found in the factory code.
+        """
+        return INIT_CODE_HASHES.get_or_set(
+            (self.chain_id, self.deployment.address), self._find_init_code_hash
         )
 
+    def _find_init_code_hash(self) -> Optional[bytes]:
+        code = bytes(self.provider.web3.eth.get_code(self.deployment.address))
+        # any token works as a reference, the factory computes the address the same way
+        reference = "0x0000000000000000000000000000000000000000"
+        expected, _ = self.contract.getLlamaPayContractByToken(reference)
+        salt = token_salt(reference)
+        for init_code_hash in init_code_candidates(code):
+            if create2_address(self.deployment.address, salt, init_code_hash) == expected:
+                return init_code_hash
+
+        logger.warning("pool creation code not found in the factory, predicting with calls")
+        return None
+
+    def predict_pool_address(self, token: str) -> AddressType:
+        """
+        Deterministic address of the pool of a token, whether it's deployed or not.
+        Computed locally, the factory is only asked if its creation code can't be found.
+        """
+        token = self._resolve_token(token)
+        if self.init_code_hash is None:
+            address, _ = self.contract.getLlamaPayContractByToken(token)
+            return address
+
+        return create2_address(self.deployment.address, token_salt(token), self.init_code_hash)
+
     def get_pool(self, token: str) -> "Pool":
         """
         Get pool by token address or symbol.
         """
-        token = self._resolve_token(token)
-        address, is_deployed = self.contract.getLlamaPayContractByToken(token)
-        if not is_deployed:
+        pool = self.get_pools([token])[token]
+        if pool is None:
+            address = self._pool_addresses[self._resolve_token(token)]
             raise PoolNotDeployed("deterministic address: %s" % address)
 
-        return Pool(address, factory=self)
+        return pool
+
+    def get_pools(self, tokens: Iterable[str]) -> Dict[str, Optional["Pool"]]:
+        """
+        Get pools of many tokens by address or symbol, None for tokens without a pool.
+
+        Pool addresses are predicted with CREATE2 and confirmed by reading their tokens while
+        the pools are loaded, in two multicall requests. Only addresses without a pool are
+        checked with the factory, in one more.
+        """
+        resolved = {token: self._resolve_token(token) for token in tokens}
+        # loading checks the identity map and then fills it, one thread at a time
+        with self._pools_lock:
+            self._load_missing_pools(list(resolved.values()))
+
+        pools: Dict[str, Optional[Pool]] = {}
+        for token, address in resolved.items():
+            pool_address = self._pool_by_token.get(address)
+            pools[token] = None if pool_address is None else self._pools[pool_address]
+        return pools
+
+    def _load_missing_pools(self, tokens: List[AddressType]):
+        missing = [token for token in dict.fromkeys(tokens) if token not in self._pool_by_token]
+        init_code_hash = self.init_code_hash if missing else None
+        if init_code_hash is not None:
+            for token in missing:
+                self._pool_addresses[token] = create2_address(
+                    self.deployment.address, token_salt(token), init_code_hash
+                )
+            self._load_pools([self._pool_addresses[token] for token in missing], tokens=missing)
+        elif missing:
+            lookups = self._lookup_pools(missing)
+            self._pool_addresses.update({token: lookups[token][0] for token in missing})
+            self._load_pools([address for address, is_deployed in lookups.values() if is_deployed])
+
+    def _lookup_pools(
+        self, tokens: List[AddressType]
+    ) -> Dict[AddressType, Tuple[AddressType, bool]]:
+        """
+        Pool addresses of tokens and whether they are deployed, read from the factory
+        in one multicall request.
+        """
+        factory_type = CONTRACT_TYPES["LlamaPayFactory"]
+        results = Multicall()(
+            [
+                Call.from_abi(
+                    self.deployment.address, factory_type, "getLlamaPayContractByToken", token
+                )
+                for token in tokens
+            ]
+        )
+        lookups = {}
+        for token, result in zip(tokens, results):
+            if result is None:
+                raise CallFailed(f"can't look up the pool of {token}")
+            address, is_deployed = result
+            lookups[token] = (address, is_deployed)
+        return lookups
+
+    def _get_pool(self, address: AddressType, token: Optional[AddressType] = None) -> "Pool":
+        if address not in self._pools:
+            self._pools[address] = Pool(address, factory=self, token=token)
+            self._pool_by_token[self._pools[address].token.address] = address
+
+        return self._pools[address]
 
     def create_pool(self, token: str, **tx_args) -> "Pool":
         """
@@ -50,9 +246,12 @@ class Factory(ManagerAccessMixin):
 
         return self.get_pool(token)
 
-    def create_stream(self, target, rate, token=None, **tx_args) -> "Stream":
+    def create_stream(self, target, rate, token=None, deposit=None, **tx_args) -> "Stream":
         """
         >>> factory.create_stream('banteg.eth', '1000 DAI/month')
+
+        Pass `deposit` to fund the stream in the same transaction, see `Pool.deposit_and_create`.
+        >>> factory.create_stream('banteg.eth', '1000 DAI/month', deposit='3000 DAI')
         """
         if token is None:
             token = rate.split("/")[0].split()[1]
@@ -64,7 +263,10 @@ class Factory(ManagerAccessMixin):
 
         pool = self.get_pool(token)
         stream = pool.make_stream(tx_args["sender"], target, rate)
-        stream.create(**tx_args)
+        if deposit is None:
+            stream.create(**tx_args)
+        else:
+            pool.deposit_and_create(stream, deposit, **tx_args)
         return stream
 
     @property
@@ -72,24 +274,142 @@ class Factory(ManagerAccessMixin):
         """
         Get all pools deployed by a factory.
         """
-        # TODO update to use multicall
         pool_count = self.contract.getLlamaPayContractCount()
-        pools = [
-            Pool(self.contract.getLlamaPayContractByIndex(i), factory=self)
-            for i in range(pool_count)
-        ]
-        return pools
+        factory_type = CONTRACT_TYPES["LlamaPayFactory"]
+        address = self.deployment.address
+        addresses = Multicall()(
+            [
+                Call.from_abi(address, factory_type, "getLlamaPayContractByIndex", i)
+                for i in range(pool_count)
+            ]
+        )
+        if None in addresses:
+            raise CallFailed("can't read the pool addresses from the factory")
+        with self._pools_lock:
+            return self._load_pools(addresses)
+
+    def _load_pools(
+        self, addresses: List[AddressType], tokens: Optional[List[AddressType]] = None
+    ) -> List["Pool"]:
+        """
+        Load pools together with their token metadata in two batched requests.
+        Pools which are already known are reused.
+
+        With `tokens`, the addresses are predicted pools of these tokens. The ones without
+        a token are checked with the factory and left out if they aren't deployed.
+        """
+        from ape_tokens.managers import ERC20
+
+        multicall = Multicall()
+        pool_type = CONTRACT_TYPES["LlamaPay"]
+        missing = [address for address in addresses if address not in self._pools]
+        pool_meta = multicall(
+            [
+                Call.from_abi(address, pool_type, name)
+                for address in missing
+                for name in ["token", "DECIMALS_DIVISOR"]
+            ]
+        )
+        deployed = list(zip(missing, pool_meta[::2], pool_meta[1::2]))
+        expected = dict(zip(addresses, tokens or []))
+        empty = [address for address, token, _ in deployed if token is None]
+        if tokens is not None and empty:
+            lookups = self._lookup_pools([expected[address] for address in empty])
+            if any(is_deployed for _, is_deployed in lookups.values()):
+                raise CallFailed(f"can't read the token of pools {empty}")
+            deployed = [item for item in deployed if item[1] is not None]
+        for address, token, _ in deployed:
+            if token is None:
+                raise CallFailed(f"can't read the token of pool {address}")
+            if tokens is not None and token != expected[address]:
+                raise CallFailed(f"pool {address} is for {token}, not {expected[address]}")
+        token_meta = multicall(
+            [
+                Call.from_abi(token, ERC20, name)
+                for _, token, _ in deployed
+                for name in ["symbol", "decimals"]
+            ]
+        )
+        for (address, token, divisor), symbol, decimals in zip(
+            deployed, token_meta[::2], token_meta[1::2]
+        ):
+            # leave the missing values to be fetched lazily, like non-standard symbols
+            if symbol is not None:
+                TOKEN_METADATA.set((self.chain_id, token, "symbol"), symbol)
+            if decimals is not None:
+                TOKEN_METADATA.set((self.chain_id, token, "decimals"), decimals)
+            pool = self._get_pool(address, token=token)
+            if divisor is not None:
+                pool.__dict__["internal_scale"] = divisor
+
+        return [self._pools[address] for address in addresses if address in self._pools]
+
+    def find_streams(
+        self,
+        *,
+        source: Optional[AddressType] = None,
+        target: Optional[AddressType] = None,
+        status: Optional[StreamStatus] = StreamStatus.ACTIVE,
+        workers: int = 8,
+    ) -> List["Stream"]:
+        """
+        Find streams by source and/or target across all pools, indexing the pools concurrently.
+        """
+        if not (source or target):
+            raise ValueError("must specify source or target")
+        # resolve ens once instead of in every pool
+        if source:
+            source = convert_address(source)
+        if target:
+            target = convert_address(target)
+
+        with ThreadPoolExecutor(workers) as executor:
+            results = executor.map(
+                lambda pool: pool.find_streams(source=source, target=target, status=status),
+                self.pools,
+            )
+            return [stream for streams in results for stream in streams]
+
+    def solvency_report(
+        self,
+        threshold: Optional[Union[int, str]] = None,
+        block: Optional[int] = None,
+        workers: int = 8,
+    ) -> List[PayerSolvency]:
+        """
+        Time to insolvency of every payer in every pool, shortest runway first.
+
+        Arguments:
+            threshold: only include payers running out within this many seconds or a duration
+                like `2 weeks`, payers already in debt have a negative runway
+            block: block number to read at [default: latest]
+            workers: number of pools to read concurrently
+        """
+        if block is None:
+            block = self.chain_manager.blocks.height
+
+        with ThreadPoolExecutor(workers) as executor:
+            results = executor.map(lambda pool: pool.solvency(block=block), self.pools)
+            rows = [row for pool_rows in results for row in pool_rows]
+
+        return within(sorted(rows, key=lambda row: row.runway), threshold)
 
     def _resolve_token(self, token: str) -> AddressType:
         """
         Resolve token address by symbol, address or ENS.
         """
+        return TOKENS.get_or_set((self.chain_id, token), lambda: self._lookup_token(token))
+
+    def _lookup_token(self, token: str) -> AddressType:
+        # token lists are slow to load, only pay for them when a symbol is looked up
+        from ape_tokens import tokens
+
         try:
             token = tokens[token].address
         except KeyError:
             pass
 
-        return self.conversion_manager.convert(token, AddressType)
+        return convert_address(token)
 
 
 class Pool(ManagerAccessMixin):
@@ -97,89 +417,405 @@ class Pool(ManagerAccessMixin):
     A pool handles all streams for a specific token.
     """
 
-    def __init__(self, address: AddressType, factory: Factory):
+    def __init__(self, address: AddressType, factory: Factory, token: Optional[AddressType] = None):
         self.address = address
         self.factory = factory
         self.contract = self.create_contract(
             self.address,
             CONTRACT_TYPES["LlamaPay"],  # type: ignore
         )
-        self.token = self.create_contract(self.contract.token(), ERC20)
+        from ape_tokens.managers import ERC20
+
+        self.token = self.create_contract(token or self.contract.token(), ERC20)
         # cache
         self._logs: List[ContractLog] = []
-        self._last_logs_block = self.factory.deployment.deploy_block
-        self._streams: List["Stream"] = []
+        self._last_logs_block: Optional[int] = None
+        # last block in the on-disk index and the indexed logs after it, which are saved
+        # once they can no longer be reorganized
+        self._stored_block: Optional[int] = None
+        self._unsaved: List[ContractLog] = []
+        self._index = StreamIndex(self)
+        # only index blocks this deep, set by `watch`
+        self.confirmations = 0
+        self._journal = False
+        self._listeners: List[Callable[[List[ContractLog]], None]] = []
 
     @cached_property
     def symbol(self):
-        return self.token.symbol()
+        key = (self.factory.chain_id, self.token.address, "symbol")
+        return TOKEN_METADATA.get_or_set(key, self.token.symbol)
 
     @cached_property
     def scale(self):
-        return 10 ** self.token.decimals()
+        key = (self.factory.chain_id, self.token.address, "decimals")
+        return 10 ** TOKEN_METADATA.get_or_set(key, self.token.decimals)
 
     @cached_property
     def internal_scale(self):
         return self.contract.DECIMALS_DIVISOR()
 
-    def _refresh_logs(self):
-        start = self._last_logs_block
+    def _refresh_logs(self, stop: Optional[int] = None):
+        """
+        Index new logs up to `stop` block [default: chain head less confirmations].
+        """
         head = self.chain_manager.blocks.height
-        if start >= head:
+        if stop is None:
+            stop = head - self.confirmations
+        if self._last_logs_block is None:
+            self._load_stored_logs(stop)
+
+        start = self._last_logs_block
+        assert start is not None
+        if start > stop:
+            return
+
+        fetcher = LogFetcher(self.address, self.contract.contract_type.events)
+        for page in fetcher.fetch(start, stop):
+            self._index_page(page, head)
+
+    def _index_page(self, page: Page, head: int):
+        # checkpoint every page, so an interrupted scan resumes where it stopped,
+        # but leave out the blocks which can still be reorganized
+        safe = head - REORG_DEPTH
+        if self.factory.persist and self._stored_block is not None:
+            # blocks indexed by an earlier refresh may have become safe since
+            self._unsaved.extend(page.logs)
+            last_block = min(page.stop, safe)
+            if last_block > self._stored_block:
+                logs = [log for log in self._unsaved if log.block_number <= last_block]
+                self.factory.store.save(
+                    self.factory.chain_id, self.address, logs, last_block=last_block
+                )
+                self._unsaved = self._unsaved[len(logs) :]
+                self._stored_block = last_block
+        self._last_logs_block = page.stop + 1
+        self._process_logs(page.logs, journal=self._journal)
+        for listener in self._listeners:
+            listener(page.logs)
+
+    def _rollback(self, block: int):
+        """
+        Forget everything indexed from `block` onwards after a chain reorganization.
+        """
+        self._index.rollback(block)
+        self._logs = [log for log in self._logs if log.block_number < block]
+        self._unsaved = [log for log in self._unsaved if log.block_number < block]
+        if self.factory.persist:
+            self.factory.store.truncate(self.factory.chain_id, self.address, block)
+        if self._stored_block is not None:
+            self._stored_block = min(self._stored_block, block - 1)
+        if self._last_logs_block is not None:
+            self._last_logs_block = min(self._last_logs_block, block)
+
+    def _reindex(self, block: int):
+        """
+        Rebuild the stream index without the blocks from `block` onwards. Unlike `_rollback`
+        this also undoes changes which were indexed without a journal.
+        """
+        logs = [log for log in self._logs if log.block_number < block]
+        self._index = StreamIndex(self)
+        self._logs = []
+        self._unsaved = [log for log in self._unsaved if log.block_number < block]
+        if self.factory.persist:
+            self.factory.store.truncate(self.factory.chain_id, self.address, block)
+        if self._stored_block is not None:
+            self._stored_block = min(self._stored_block, block - 1)
+        if not self.factory.keep_logs:
+            # nothing to rebuild from, start over from the store and the chain
+            self._unsaved = []
+            self._last_logs_block = self._stored_block = None
+            return
+
+        self._process_logs(logs)
+        self._last_logs_block = block
+
+    def _load_stored_logs(self, head: int):
+        """
+        Resume from the on-disk index, only the blocks after its checkpoint need to be fetched.
+        """
+        self._last_logs_block = self.factory.deploy_block
+        self._stored_block = self.factory.deploy_block - 1
+        self._unsaved = []
+        checkpoint = self.factory.store.get_checkpoint(self.factory.chain_id, self.address)
+        if checkpoint is None:
             return
 
-        logs = list(
-            self.provider.get_contract_logs(
+        self._stored_block = checkpoint
+        # the index could be ahead of the chain or a fork point, only take what it can see
+        checkpoint = min(checkpoint, self.factory.store_limit(head))
+        if checkpoint < self.factory.deploy_block:
+            return
+        logs = self.factory.store.iter(self.factory.chain_id, self.address, stop_block=checkpoint)
+        self._last_logs_block = checkpoint + 1
+        self._process_logs(logs)
+
+    def _process_logs(self, logs: Iterable[ContractLog], journal: bool = False):
+        if self.factory.keep_logs:
+            logs = list(logs)
+            self._logs.extend(logs)
+
+        for log in logs:
+            self._index.apply(log, journal=journal)
+
+    def iter_logs(
+        self,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        events: Optional[List[str]] = None,
+    ) -> Iterator[ContractLog]:
+        """
+        Iterate over pool events without keeping them in memory.
+
+        The range covered by the on-disk index is read from it, the rest is fetched page by page.
+
+        Arguments:
+            start: first block [default: factory deploy block]
+            stop: last block [default: chain head]
+            events: event names to include [default: all events]
+        """
+        if start is None:
+            start = self.factory.deploy_block
+        if stop is None:
+            stop = self.chain_manager.blocks.height
+
+        checkpoint = self.factory.store.get_checkpoint(self.factory.chain_id, self.address)
+        if checkpoint is not None:
+            checkpoint = min(checkpoint, self.factory.store_limit(stop))
+        if checkpoint is not None and checkpoint >= start:
+            yield from self.factory.store.iter(
+                self.factory.chain_id,
                 self.address,
-                self.contract.contract_type.events,
                 start_block=start,
-                stop_block=head,
-                block_page_size=10_000,
+                stop_block=min(checkpoint, stop),
+                names=events,
             )
+            start = checkpoint + 1
+
+        if start > stop:
+            return
+        abis = self.contract.contract_type.events
+        if events is not None:
+            abis = [abi for abi in abis if abi.name in events]
+        for page in LogFetcher(self.address, abis).fetch(start, stop):
+            yield from page.logs
+
+    def iter_streams(
+        self,
+        *,
+        source: Optional[AddressType] = None,
+        target: Optional[AddressType] = None,
+        status: Optional[StreamStatus] = StreamStatus.ACTIVE,
+    ) -> Iterator["Stream"]:
+        """
+        Iterate over streams, creating `Stream` objects one at a time.
+        Without `source` or `target` all streams in a pool are included.
+        """
+        if source:
+            source = convert_address(source)
+        if target:
+            target = convert_address(target)
+
+        index = self._lookup_index(source, target)
+        for row in index.find_rows(source=source, target=target, status=status):
+            yield index.stream(row)
+
+    def _lookup_index(
+        self, source: Optional[AddressType], target: Optional[AddressType]
+    ) -> StreamIndex:
+        """
+        Index to answer a lookup from. A pool which was never indexed only fetches the events
+        of the addresses asked about instead of scanning its whole history.
+        """
+        cold = self._last_logs_block is None and (
+            self.factory.store.get_checkpoint(self.factory.chain_id, self.address) is None
         )
-        self._last_logs_block = head + 1
-        self._logs.extend(logs)
+        if not cold or not (source or target):
+            self._refresh_logs()
+            return self._index
 
-        for log in logs:
-            if log.name in ["StreamCreated", "StreamCreatedWithReason", "StreamModified"]:
-                self._streams.append(
-                    Stream(
-                        source=log.event_arguments["from"],
-                        target=log.to,
-                        rate=log.amountPerSec,
-                        pool=self,
-                    )
-                )
+        index = StreamIndex(self)
+        for log in self._fetch_stream_logs(source, target):
+            index.apply(log)
+        return index
+
+    def _fetch_stream_logs(
+        self, source: Optional[AddressType], target: Optional[AddressType]
+    ) -> List[ContractLog]:
+        """
+        Fetch stream events of a source and/or target with topic filters, in block order.
+
+        The target is the second topic, except for the new target of `StreamModified`,
+        which is the third one and needs its own query.
+        """
+        start = self.factory.deploy_block
+        stop = self.chain_manager.blocks.height - self.confirmations
+        abis = {abi.name: abi for abi in self.contract.contract_type.events}
+        from_topic = [address_topic(source)] if source else None
+        queries = [([abis[name] for name in STREAM_EVENTS], [from_topic])]
+        if target:
+            to_topic = [address_topic(target)]
+            queries = [
+                ([abis[name] for name in STREAM_EVENTS], [from_topic, to_topic]),
+                ([abis["StreamModified"]], [from_topic, None, to_topic]),
+            ]
+
+        logs = {}
+        for events, topics in queries:
+            # matching logs are sparse, try the whole range in one request
+            fetcher = LogFetcher(self.address, events, topics, page_size=stop - start + 1)
+            for page in fetcher.fetch(start, stop):
+                logs.update({(log.block_number, log.log_index): log for log in page.logs})
+
+        return [logs[key] for key in sorted(logs)]
+
+    def watch(
+        self,
+        confirmations: int = 6,
+        poll_interval: float = 5.0,
+        callback: Optional[Callable[[StreamEvent], None]] = None,
+    ) -> Watcher:
+        """
+        Follow new stream events as blocks get confirmed.
+
+        >>> for event in pool.watch(confirmations=6):
+        ...     print(event.kind, event.stream)
+
+        Events from blocks which get reorganized are emitted again with `removed=True`,
+        after which the new chain is replayed.
+
+        Arguments:
+            confirmations: only index blocks this deep
+            poll_interval: seconds between polls for new blocks
+            callback: run forever calling this with each event instead of returning an iterator
+        """
+        watcher = Watcher(self, confirmations=confirmations, poll_interval=poll_interval)
+        if callback is not None:
+            watcher.run(callback)
+        return watcher
 
     @property
     def all_streams(self) -> List["Stream"]:
+        """
+        All active streams in a pool.
+        """
         self._refresh_logs()
-        return self._streams[:]
+        return self._index.find()
 
     def find_streams(
         self,
         *,
         source: Optional[AddressType] = None,
         target: Optional[AddressType] = None,
+        status: Optional[StreamStatus] = StreamStatus.ACTIVE,
     ) -> List["Stream"]:
+        """
+        Find streams by source and/or target, only active ones unless another `status` is given.
+        Pass `status=None` to include paused and cancelled streams.
+        """
+        if not (source or target):
+            raise ValueError("must specify source or target")
         # handle ens
         if source:
-            source = self.conversion_manager.convert(source, AddressType)
+            source = convert_address(source)
         if target:
-            target = self.conversion_manager.convert(target, AddressType)
-        # source & target
-        if source and target:
-            return [s for s in self.all_streams if s.source == source and s.target == target]
-        elif source:
-            return [s for s in self.all_streams if s.source == source]
-        elif target:
-            return [s for s in self.all_streams if s.target == target]
-        else:
-            raise ValueError("must specify source or target")
+            target = convert_address(target)
+
+        return self._lookup_index(source, target).find(source=source, target=target, status=status)
+
+    def solvency(self, block: Optional[int] = None, chunk_size: int = 500) -> List[PayerSolvency]:
+        """
+        Time to insolvency of every payer with active streams, shortest runway first.
+        Only payer state is read, in bulk through multicall.
+        """
+        self._refresh_logs()
+        table = self._index.table
+        payers = list(dict.fromkeys(table.source(row) for row in self._index.find_rows()))
+        snapshot = self.snapshot(streams=[], payers=payers, block=block, chunk_size=chunk_size)
+        return payer_solvency(self, snapshot)
+
+    @cached_property
+    def history(self) -> StreamHistory:
+        return StreamHistory(self)
+
+    def streams_at(
+        self, block: Optional[int] = None, *, timestamp: Optional[Timestamp] = None
+    ) -> List["Stream"]:
+        """
+        Streams which were active at a block or a timestamp, computed from the event history.
+
+        >>> pool.streams_at(15_000_000)
+        >>> pool.streams_at(timestamp=datetime(2022, 6, 30))
+        """
+        self.history.update()
+        return self.history.streams_at(block=block, timestamp=timestamp)
+
+    def accrued_between(self, start: Timestamp, end: Timestamp) -> List[Accrual]:
+        """
+        Amount each stream accrued between two timestamps or datetimes, from the event history.
+        Use `llamapay.history.by_payer` to sum them up by payer.
+        """
+        self.history.update()
+        return self.history.accrued_between(start, end)
 
     def get_balance(self, source: AddressType) -> Decimal:
         return Decimal(self.contract.getPayerBalance(source)) / self.scale
 
+    def snapshot(
+        self,
+        streams: Optional[List["Stream"]] = None,
+        payers: Optional[List[AddressType]] = None,
+        block: Optional[int] = None,
+        chunk_size: int = 500,
+    ) -> Snapshot:
+        """
+        Read withdrawable amounts and payer balances in bulk, all at the same block.
+
+        Arguments:
+            streams: streams to read [default: all active streams]
+            payers: payers to read [default: sources of the streams]
+            block: block number to read at [default: latest]
+            chunk_size: number of calls per multicall request
+        """
+        if streams is None:
+            streams = self.all_streams
+        if payers is None:
+            payers = list(dict.fromkeys(stream.source for stream in streams))
+        if block is None:
+            block = self.chain_manager.blocks.height
+
+        pool_type = CONTRACT_TYPES["LlamaPay"]
+        calls = []
+        for stream in streams:
+            args = stream.source, stream.target, stream.rate
+            calls.append(Call.from_abi(self.address, pool_type, "withdrawable", *args))
+            calls.append(Call.from_abi(self.address, pool_type, "streamToStart", stream.id))
+        for payer in payers:
+            calls.append(Call.from_abi(self.address, pool_type, "getPayerBalance", payer))
+            calls.append(Call.from_abi(self.address, pool_type, "payers", payer))
+            calls.append(Call.from_abi(self.address, pool_type, "balances", payer))
+
+        results = Multicall(chunk_size=chunk_size)(calls, block=block)
+        stream_results, payer_results = results[: 2 * len(streams)], results[2 * len(streams) :]
+        withdrawable = [result or (None, None, None) for result in stream_results[::2]]
+        payer_state = [result or (None, None) for result in payer_results[1::3]]
+
+        return Snapshot(
+            block=block,
+            timestamp=self.provider.get_block(block).timestamp,
+            scale=self.scale,
+            internal_scale=self.internal_scale,
+            streams=streams,
+            withdrawable=[item[0] for item in withdrawable],
+            last_update=[item[1] for item in withdrawable],
+            owed=[item[2] for item in withdrawable],
+            stream_starts=stream_results[1::2],
+            payers=payers,
+            payer_balances=payer_results[::3],
+            last_payer_update=[item[0] for item in payer_state],
+            total_paid_per_sec=[item[1] for item in payer_state],
+            balances=payer_results[2::3],
+        )
+
     def approve(self, amount=None, **tx_args) -> ReceiptAPI:
         """
         Approve token to be deposited into a pool.
@@ -204,6 +840,130 @@ class Pool(ManagerAccessMixin):
         print(amount)
         return self.contract.deposit(amount, **tx_args)
 
+    def deposit_and_create(
+        self, stream: "Stream", amount, reason: Optional[str] = None, permit=True, **tx_args
+    ) -> ReceiptAPI:
+        """
+        Deposit funding balance and create a stream in a single transaction.
+
+        If the allowance is too low and the token supports EIP-2612, a signed permit is sent
+        along in a batch, otherwise the pool is approved in a separate transaction first.
+
+        Arguments:
+            stream: stream to create
+            amount: str, decimal or wei amount in tokens
+            reason: optional reason stored in the creation event
+            permit: use a signed permit if the token supports it
+        """
+        sender = tx_args["sender"]
+        assert sender == stream.source, f"sender must be {stream.source}"
+        amount = self._convert_amount(amount)
+        method, args = "depositAndCreate", [amount, stream.target, stream.rate]
+        if reason:
+            method = "depositAndCreateWithReason"
+            args.append(reason)
+
+        if self.token.allowance(sender, self.address) < amount:
+            if permit and self.permit_domain:
+                permit_call = self._sign_permit(sender, amount)
+                create_call = Call.from_abi(self.address, CONTRACT_TYPES["LlamaPay"], method, *args)
+                return self.contract.batch(
+                    [permit_call.encode(), create_call.encode()], True, **tx_args
+                )
+
+            self.approve(amount, **tx_args)
+
+        return getattr(self.contract, method)(*args, **tx_args)
+
+    @cached_property
+    def permit_domain(self) -> Optional[dict]:
+        """
+        EIP-712 domain of the token if it supports EIP-2612 permits, otherwise None.
+        Tokens with a different permit, like DAI, are not supported.
+        """
+        token = self.token.address
+        domain_separator, typehash, name, version = Multicall()(
+            [
+                Call(token, "DOMAIN_SEPARATOR", (), ("bytes32",)),
+                Call(token, "PERMIT_TYPEHASH", (), ("bytes32",)),
+                Call(token, "name", (), ("string",)),
+                Call(token, "version", (), ("string",)),
+            ]
+        )
+        if domain_separator is None or name is None:
+            return None
+        if typehash is not None and typehash != PERMIT_TYPEHASH:
+            return None
+
+        chain_id = self.provider.chain_id
+        for version in [version] if version else ["1", "2"]:
+            expected = keccak(
+                encode_abi(
+                    ["bytes32", "bytes32", "bytes32", "uint256", "address"],
+                    [
+                        EIP712_DOMAIN_TYPEHASH,
+                        keccak(text=name),
+                        keccak(text=version),
+                        chain_id,
+                        token,
+                    ],
+                )
+            )
+            if expected == domain_separator:
+                return dict(name=name, version=version, chainId=chain_id, verifyingContract=token)
+
+        return None
+
+    def _sign_permit(self, owner, amount: int, deadline: Optional[int] = None) -> Call:
+        """
+        Sign an EIP-2612 permit for the pool and prepare a `permitToken` call for the batch.
+        """
+        if deadline is None:
+            deadline = self.provider.get_block("latest").timestamp + 3600
+        (nonce,) = Multicall()(
+            [Call(self.token.address, "nonces", ("address",), ("uint256",), (str(owner),))]
+        )
+        message = {
+            "types": {
+                "EIP712Domain": [
+                    {"name": "name", "type": "string"},
+                    {"name": "version", "type": "string"},
+                    {"name": "chainId", "type": "uint256"},
+                    {"name": "verifyingContract", "type": "address"},
+                ],
+                "Permit": [
+                    {"name": "owner", "type": "address"},
+                    {"name": "spender", "type": "address"},
+                    {"name": "value", "type": "uint256"},
+                    {"name": "nonce", "type": "uint256"},
+                    {"name": "deadline", "type": "uint256"},
+                ],
+            },
+            "primaryType": "Permit",
+            "domain": self.permit_domain,
+            "message": {
+                "owner": str(owner),
+                "spender": self.address,
+                "value": amount,
+                "nonce": nonce,
+                "deadline": deadline,
+            },
+        }
+        signature = owner.sign_message(encode_structured_data(message))
+        return Call.from_abi(
+            self.address,
+            CONTRACT_TYPES["LlamaPay"],
+            "permitToken",
+            self.token.address,
+            str(owner),
+            self.address,
+            amount,
+            deadline,
+            signature.v,
+            signature.r,
+            signature.s,
+        )
+
     def withdraw(self, amount=None, **tx_args) -> ReceiptAPI:
         """
         Withdraw funding balance from a pool.
@@ -219,12 +979,27 @@ class Pool(ManagerAccessMixin):
         else:
             return self.contract.withdrawPayerAll(**tx_args)
 
+    def batch(self, revert_on_fail: bool = False, gas_limit: int = 10_000_000, **tx_args) -> Batch:
+        """
+        Queue stream operations and send them in as few transactions as possible.
+
+        >>> with pool.batch(sender=dev) as batch:
+        ...     for stream in streams:
+        ...         batch.create(stream)
+        >>> batch.results
+
+        Arguments:
+            revert_on_fail: revert the whole transaction if any operation fails
+            gas_limit: gas budget per transaction, larger batches are split
+        """
+        return Batch(self, revert_on_fail=revert_on_fail, gas_limit=gas_limit, **tx_args)
+
     def make_stream(self, source, target, rate) -> "Stream":
         """
         Prepare a stream and calculate the rate.
         """
-        source = self.conversion_manager.convert(source, AddressType)
-        target = self.conversion_manager.convert(target, AddressType)
+        source = convert_address(source)
+        target = convert_address(target)
         rate = convert_rate(rate)
         return Stream(source, target, rate, self)
 
@@ -253,6 +1028,9 @@ class Pool(ManagerAccessMixin):
         assert isinstance(other, Pool)
         return self.address == other.address
 
+    def __hash__(self) -> int:
+        return hash(self.address)
+
 
 @dataclass
 class Stream(ManagerAccessMixin):
@@ -266,10 +1044,22 @@ class Stream(ManagerAccessMixin):
     pool: Pool
 
     def __post_init__(self):
-        self.source = self.conversion_manager.convert(self.source, AddressType)
-        self.target = self.conversion_manager.convert(self.target, AddressType)
+        self.source = convert_address(self.source)
+        self.target = convert_address(self.target)
         self.rate = convert_rate(self.rate)
 
+    @classmethod
+    def trusted(cls, source: AddressType, target: AddressType, rate: int, pool: Pool) -> "Stream":
+        """
+        Build a stream from checksummed addresses and an internal rate, skipping conversion.
+        """
+        stream = cls.__new__(cls)
+        stream.source = source
+        stream.target = target
+        stream.rate = rate
+        stream.pool = pool
+        return stream
+
     @property
     def id(self) -> bytes:
         return keccak(
@@ -311,6 +1101,14 @@ class Stream(ManagerAccessMixin):
 
     withdraw = send
 
+    @property
+    def status(self) -> Optional[StreamStatus]:
+        """
+        Stream status according to the pool event index, None if the stream was never created.
+        """
+        self.pool._refresh_logs()
+        return self.pool._index.status(self.id)
+
     @property
     def balance(self):
         """
@@ -320,6 +1118,19 @@ class Stream(ManagerAccessMixin):
         return Decimal(result.withdrawableAmount) / self.pool.scale
 
 
+def convert_address(value) -> AddressType:
+    """
+    Convert an address, account or ENS name to a checksummed address.
+    Checksummed addresses are returned as is, other lookups are cached.
+    """
+    if isinstance(value, str) and is_checksum_address(value):
+        return value  # type: ignore
+
+    return ADDRESSES.get_or_set(
+        str(value), lambda: ManagerAccessMixin.conversion_manager.convert(value, AddressType)
+    )
+
+
 def convert_rate(rate):
     if isinstance(rate, int):
         return rate
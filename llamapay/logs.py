@@ -0,0 +1,186 @@
+import heapq
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from ape.types import AddressType, ContractLog
+from ape.utils import ManagerAccessMixin
+from eth_abi import decode_abi, decode_single
+from eth_utils import encode_hex, keccak, to_checksum_address
+
+# fragments of provider errors which mean the page should be smaller
+RANGE_ERRORS = [
+    "too many",
+    "more than",
+    "limit",
+    "range",
+    "exceed",
+    "timeout",
+    "timed out",
+    "response size",
+]
+
+Topic = Optional[List[str]]
+
+# the same few payers and payees appear in most logs, avoid hashing them again
+checksum_address = lru_cache(maxsize=65536)(to_checksum_address)
+
+
+class Page(NamedTuple):
+    start: int
+    stop: int
+    logs: List[ContractLog]
+
+
+def event_topic(abi) -> str:
+    return encode_hex(keccak(text=f"{abi.name}({','.join(item.type for item in abi.inputs)})"))
+
+
+def address_topic(address: AddressType) -> str:
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+
+def decode_log(raw: dict, events: Dict[str, object]) -> Optional[ContractLog]:
+    """
+    Decode a raw log into a `ContractLog`, or None if it's not one of the known events.
+    """
+    topics = [encode_hex(topic) for topic in raw["topics"]]
+    abi = events.get(topics[0]) if topics else None
+    if abi is None:
+        return None
+
+    indexed = [item for item in abi.inputs if item.indexed]  # type: ignore
+    data = [item for item in abi.inputs if not item.indexed]  # type: ignore
+    arguments = {}
+    for item, topic in zip(indexed, topics[1:]):
+        value = decode_single(item.type, bytes.fromhex(topic[2:]))
+        arguments[item.name] = checksum_address(value) if item.type == "address" else value
+
+    raw_data = raw["data"]
+    if isinstance(raw_data, str):
+        raw_data = bytes.fromhex(raw_data[2:])
+    values = decode_abi([item.type for item in data], raw_data)
+    for item, value in zip(data, values):
+        arguments[item.name] = checksum_address(value) if item.type == "address" else value
+
+    return ContractLog(
+        name=abi.name,  # type: ignore
+        contract_address=checksum_address(raw["address"]),
+        event_arguments={item.name: arguments[item.name] for item in abi.inputs},  # type: ignore
+        transaction_hash=encode_hex(raw["transactionHash"]),
+        block_number=raw["blockNumber"],
+        block_hash=encode_hex(raw["blockHash"]),
+        log_index=raw["logIndex"],
+    )
+
+
+class LogFetcher(ManagerAccessMixin):
+    """
+    Fetch contract logs over a block range with a bounded pool of concurrent requests.
+
+    Pages shrink when a provider complains about too many results or times out,
+    grow over sparse ranges, and failed pages are retried on their own.
+    Pages are always yielded in block order. While an earlier page is retried, at most
+    `max_ready` later pages wait for it in memory before fetching pauses.
+    """
+
+    def __init__(
+        self,
+        address: AddressType,
+        events: Sequence,
+        topics: Sequence[Topic] = (),
+        workers: int = 8,
+        page_size: int = 10_000,
+        min_page_size: int = 10,
+        max_page_size: int = 1_000_000,
+        target_results: int = 2_000,
+        retries: int = 5,
+        max_ready: Optional[int] = None,
+    ):
+        self.address = address
+        self.events = {event_topic(abi): abi for abi in events}
+        # the first topic is always the event signature
+        self.topics = [list(self.events), *topics]
+        self.workers = workers
+        self.page_size = page_size
+        self.min_page_size = min_page_size
+        self.max_page_size = max_page_size
+        self.target_results = target_results
+        self.retries = retries
+        self.max_ready = max_ready if max_ready is not None else 4 * workers
+
+    def _get_logs(self, start: int, stop: int, attempt: int) -> List[ContractLog]:
+        if attempt:
+            time.sleep(min(2**attempt * 0.1, 10))
+        raw_logs = self.provider.web3.eth.get_logs(  # type: ignore
+            {
+                "address": self.address,
+                "fromBlock": start,
+                "toBlock": stop,
+                "topics": self.topics,
+            }
+        )
+        logs = [decode_log(raw, self.events) for raw in raw_logs]
+        return [log for log in logs if log is not None]
+
+    def _adapt(self, results: int):
+        if results < self.target_results // 4:
+            self.page_size = min(self.max_page_size, self.page_size * 2)
+        elif results > self.target_results:
+            self.page_size = max(self.min_page_size, self.page_size // 2)
+
+    def fetch(self, start: int, stop: int) -> Iterator[Page]:
+        """
+        Yield pages of logs between `start` and `stop` blocks inclusive, in block order.
+        """
+        next_block = start
+        emit_from = start
+        retry: List[Tuple[int, int, int]] = []  # heap of (start, stop, attempt)
+        pending: Dict[Future, Tuple[int, int, int]] = {}
+        ready: Dict[int, Page] = {}
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            while emit_from <= stop:
+                while len(pending) < self.workers:
+                    if retry:
+                        lo, hi, attempt = heapq.heappop(retry)
+                    elif next_block <= stop and len(ready) < self.max_ready:
+                        lo, hi, attempt = next_block, min(stop, next_block + self.page_size - 1), 0
+                        next_block = hi + 1
+                    else:
+                        break
+                    pending[executor.submit(self._get_logs, lo, hi, attempt)] = (lo, hi, attempt)
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    lo, hi, attempt = pending.pop(future)
+                    try:
+                        logs = future.result()
+                    except Exception as error:
+                        if hi > lo and _is_range_error(error):
+                            mid = (lo + hi) // 2
+                            heapq.heappush(retry, (lo, mid, 0))
+                            heapq.heappush(retry, (mid + 1, hi, 0))
+                            self.page_size = max(self.min_page_size, (hi - lo + 1) // 2)
+                        elif attempt < self.retries:
+                            heapq.heappush(retry, (lo, hi, attempt + 1))
+                        else:
+                            raise
+                        continue
+
+                    self._adapt(len(logs))
+                    ready[lo] = Page(lo, hi, logs)
+
+                while emit_from in ready:
+                    page = ready.pop(emit_from)
+                    emit_from = page.stop + 1
+                    yield page
+
+
+def _is_range_error(error: Exception) -> bool:
+    message = f"{type(error).__name__} {error}".lower()
+    # rate limits need a backoff, not more requests
+    if "rate limit" in message:
+        return False
+    return any(fragment in message for fragment in RANGE_ERRORS)
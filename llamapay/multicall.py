@@ -0,0 +1,151 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from ape.types import AddressType
+from ape.utils import ManagerAccessMixin
+from eth_abi import decode_abi, encode_abi
+from eth_utils import keccak, to_checksum_address
+from web3.exceptions import ContractLogicError
+
+# https://github.com/mds1/multicall, deployed at the same address on most chains
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3 = keccak(text="aggregate3((address,bool,bytes)[])")[:4]
+
+BlockID = Union[int, str]
+
+# errors which mean a batch is too large for the provider rather than that the provider is down
+TOO_LARGE = ["gas", "too large", "too big", "exceed", "payload", "413", "response size"]
+
+
+class Call(NamedTuple):
+    """
+    A contract call which can be encoded and decoded without a contract instance.
+    """
+
+    target: AddressType
+    name: str
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+    args: tuple = ()
+
+    @classmethod
+    def from_abi(cls, target: AddressType, contract_type, name: str, *args) -> "Call":
+        abi = next(
+            abi
+            for abi in contract_type.abi
+            if abi.type == "function" and abi.name == name and len(abi.inputs) == len(args)
+        )
+        return cls(
+            target=target,
+            name=name,
+            inputs=tuple(item.type for item in abi.inputs),
+            outputs=tuple(item.type for item in abi.outputs),
+            args=args,
+        )
+
+    @property
+    def selector(self) -> bytes:
+        return keccak(text=f"{self.name}({','.join(self.inputs)})")[:4]
+
+    def encode(self) -> bytes:
+        return self.selector + encode_abi(self.inputs, self.args)
+
+    def decode(self, data: bytes) -> Any:
+        values = [
+            to_checksum_address(value) if kind == "address" else value
+            for kind, value in zip(self.outputs, decode_abi(self.outputs, data))
+        ]
+        return values[0] if len(values) == 1 else tuple(values)
+
+
+class Multicall(ManagerAccessMixin):
+    """
+    Batch read-only calls through Multicall3, falling back to one call per request
+    on chains where it's not deployed.
+
+    Failed or undecodable calls result in `None`, so one bad token doesn't spoil the batch.
+    Errors of the provider itself are raised.
+    """
+
+    # chain id -> whether multicall is deployed
+    _deployed: Dict[int, bool] = {}
+
+    def __init__(self, chunk_size: int = 500):
+        self.chunk_size = chunk_size
+
+    @property
+    def web3(self):
+        return self.provider.web3  # type: ignore
+
+    @property
+    def available(self) -> bool:
+        chain_id = self.provider.chain_id
+        if chain_id not in self._deployed:
+            self._deployed[chain_id] = len(self.web3.eth.get_code(MULTICALL3)) > 0
+        return self._deployed[chain_id]
+
+    def __call__(self, calls: Sequence[Call], block: Optional[BlockID] = None) -> List[Any]:
+        block = "latest" if block is None else block
+        if not self.available:
+            return [self._call_one(call, block) for call in calls]
+
+        results: List[Any] = []
+        for i in range(0, len(calls), self.chunk_size):
+            results.extend(self._aggregate(calls[i : i + self.chunk_size], block))
+        return results
+
+    def _aggregate(self, calls: Sequence[Call], block: BlockID) -> List[Any]:
+        if not calls:
+            return []
+        data = AGGREGATE3 + encode_abi(
+            ["(address,bool,bytes)[]"], [[(call.target, True, _encode(call)) for call in calls]]
+        )
+        try:
+            response = self.web3.eth.call({"to": MULTICALL3, "data": data}, block)
+        except Exception as error:
+            if len(calls) == 1 or not _too_large(error):
+                raise
+            # the batch is too large for the provider, split it up
+            half = len(calls) // 2
+            return self._aggregate(calls[:half], block) + self._aggregate(calls[half:], block)
+
+        (returned,) = decode_abi(["(bool,bytes)[]"], response)
+        return [
+            _safe_decode(call, data) if success else None
+            for call, (success, data) in zip(calls, returned)
+        ]
+
+    def _call_one(self, call: Call, block: BlockID) -> Any:
+        try:
+            data = self.web3.eth.call({"to": call.target, "data": _encode(call)}, block)
+        except Exception as error:
+            if not _reverted(error):
+                raise
+            return None
+        return _safe_decode(call, data)
+
+
+def _encode(call: Call) -> bytes:
+    if not call.target:
+        raise ValueError(f"{call.name} has no target")
+    try:
+        return call.encode()
+    except Exception as error:
+        raise ValueError(f"can't encode {call.name}{call.args} to {call.target}: {error}")
+
+
+def _too_large(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(hint in message for hint in TOO_LARGE)
+
+
+def _reverted(error: Exception) -> bool:
+    # older nodes report reverts as a plain error response
+    return isinstance(error, ContractLogicError) or "revert" in str(error).lower()
+
+
+def _safe_decode(call: Call, data: bytes) -> Any:
+    try:
+        return call.decode(data)
+    except Exception:
+        # e.g. empty return data from a non-contract or a bytes32 symbol
+        return None
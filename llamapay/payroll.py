@@ -0,0 +1,219 @@
+import csv
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Union, cast
+
+from ape.api import AccountAPI
+from ape.types import AddressType
+
+from llamapay.batch import Batch, BatchResult
+from llamapay.constants import DURATION_TO_SECONDS, PRECISION
+from llamapay.exceptions import PoolNotDeployed
+from llamapay.llamapay import convert_address, convert_rate
+from llamapay.solvency import convert_duration
+
+if TYPE_CHECKING:
+    from llamapay.llamapay import Factory, Pool, Stream
+
+
+@dataclass
+class PayrollRow:
+    """
+    One line of a payroll: who gets paid, how much and in which token.
+    """
+
+    recipient: str
+    rate: Union[int, str]
+    token: str
+
+
+@dataclass
+class Change:
+    action: str  # create, modify or cancel
+    stream: "Stream"
+    # the stream which replaces `stream`, only for modifications
+    new_stream: Optional["Stream"] = None
+
+
+@dataclass
+class Plan:
+    """
+    Changes which bring on-chain streams in line with a payroll, and deposits which fund them.
+    """
+
+    # the account which signs the transactions
+    sender: Union[AccountAPI, AddressType]
+    # address of the sender, which the changes were diffed against
+    address: AddressType
+    changes: Dict["Pool", List[Change]] = field(default_factory=dict)
+    # raw token amounts
+    deposits: Dict["Pool", int] = field(default_factory=dict)
+    unchanged: int = 0
+
+    def __len__(self) -> int:
+        return sum(len(changes) for changes in self.changes.values()) + len(self.deposits)
+
+    def show(self) -> str:
+        """
+        Describe the plan without sending anything.
+        """
+        month = DURATION_TO_SECONDS["month"]
+        lines = []
+        for pool, amount in self.deposits.items():
+            lines.append(f"deposit {pool.symbol:<6} {Decimal(amount) / pool.scale}")
+        for pool, changes in self.changes.items():
+            for change in changes:
+                rate = change.stream.rate
+                per_month = f"{Decimal(rate * month) / PRECISION:.2f}"
+                if change.new_stream:
+                    new_rate = change.new_stream.rate
+                    per_month += f" -> {Decimal(new_rate * month) / PRECISION:.2f}"
+                lines.append(
+                    f"{change.action:<7} {pool.symbol:<6} {change.stream.target} "
+                    f"{per_month} {pool.symbol}/month"
+                )
+        lines.append(f"{len(self)} actions, {self.unchanged} streams unchanged")
+        text = "\n".join(lines)
+        print(text)
+        return text
+
+    def execute(self, **tx_args) -> List[BatchResult]:
+        """
+        Send the plan, deposits first, then one batch of stream changes per pool.
+        """
+        tx_args.setdefault("sender", self.sender)
+        results = []
+        for pool, amount in self.deposits.items():
+            pool.deposit(amount, **tx_args)
+
+        for pool, changes in self.changes.items():
+            batch = Batch(pool, **tx_args)
+            for change in changes:
+                if change.action == "create":
+                    batch.create(change.stream)
+                elif change.action == "modify":
+                    assert change.new_stream is not None
+                    batch.replace(change.stream, change.new_stream)
+                elif change.action == "cancel":
+                    batch.cancel(change.stream)
+            results.extend(batch.execute())
+
+        return results
+
+
+def load_rows(path: Union[str, Path]) -> List[PayrollRow]:
+    """
+    Read a payroll from a CSV with `recipient,rate,token` columns or a JSON list of objects.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        items = json.loads(path.read_text())
+    else:
+        with path.open(newline="") as f:
+            items = list(csv.DictReader(f))
+
+    return [
+        PayrollRow(recipient=item["recipient"].strip(), rate=item["rate"], token=item["token"])
+        for item in items
+    ]
+
+
+def reconcile(
+    factory: "Factory",
+    rows: List[PayrollRow],
+    sender: Union[AccountAPI, AddressType],
+    cancel_missing: bool = True,
+    runway: Optional[Union[int, str]] = "month",
+    workers: int = 8,
+) -> Plan:
+    """
+    Diff a payroll against the active streams of `sender` and plan the fewest changes.
+
+    Recipients which are already paid at the right rate are left alone, a recipient paid
+    at a different rate gets the stream modified, and streams to recipients missing from
+    the payroll are cancelled, or redirected to new recipients where there are any.
+    Each pool is read once, whatever the number of rows.
+
+    Arguments:
+        factory: factory of the pools
+        rows: the desired payroll, at most one row per recipient and token
+        sender: the payer of the streams, an account to be able to execute the plan
+        cancel_missing: cancel streams to recipients which are not in the payroll
+        runway: deposit enough to keep paying for this many seconds or a duration
+            like `3 months`, None to skip deposits
+        workers: number of ens names to resolve concurrently
+    """
+    address = convert_address(sender)
+    names = list(dict.fromkeys(row.recipient for row in rows))
+    with ThreadPoolExecutor(workers) as executor:
+        addresses = dict(zip(names, executor.map(convert_address, names)))
+
+    found = factory.get_pools(list(dict.fromkeys(row.token for row in rows)))
+    missing = [token for token, pool in found.items() if pool is None]
+    if missing:
+        raise PoolNotDeployed(f"no pool for {', '.join(missing)}")
+    pools = cast(Dict[str, "Pool"], found)
+    desired: Dict["Pool", Dict[AddressType, int]] = defaultdict(dict)
+    for row in rows:
+        pool, target = pools[row.token], addresses[row.recipient]
+        if target in desired[pool]:
+            raise ValueError(f"{row.recipient} is paid twice in {row.token}")
+        desired[pool][target] = convert_rate(row.rate)
+
+    # one lookup per pool, concurrently, instead of one per row
+    streams: Dict["Pool", List["Stream"]] = defaultdict(list)
+    if cancel_missing:
+        # include pools the sender streams from but which are no longer in the payroll
+        for stream in factory.find_streams(source=address, workers=workers):
+            streams[stream.pool].append(stream)
+            desired.setdefault(stream.pool, {})
+    else:
+        for pool in desired:
+            streams[pool] = pool.find_streams(source=address)
+
+    plan = Plan(sender=sender, address=address)
+    for pool, rates in desired.items():
+        current: Dict[AddressType, List["Stream"]] = defaultdict(list)
+        for stream in streams[pool]:
+            current[stream.target].append(stream)
+
+        changes, creates = [], []
+        for target, rate in rates.items():
+            existing = current.pop(target, [])
+            same = [stream for stream in existing if stream.rate == rate]
+            if same:
+                plan.unchanged += 1
+                existing.remove(same[0])
+            elif existing:
+                new_stream = pool.make_stream(address, target, rate)
+                changes.append(Change("modify", existing.pop(0), new_stream))
+            else:
+                creates.append(pool.make_stream(address, target, rate))
+            # duplicate streams to the same recipient
+            changes.extend(Change("cancel", stream) for stream in existing)
+
+        stale = [stream for streams in current.values() for stream in streams]
+        if not cancel_missing:
+            stale = []
+        # a stream which would be cancelled can be redirected to a new recipient instead
+        for old, new_stream in zip(stale, creates):
+            changes.append(Change("modify", old, new_stream))
+        changes.extend(Change("cancel", stream) for stream in stale[len(creates) :])
+        changes.extend(Change("create", stream) for stream in creates[len(stale) :])
+
+        if changes:
+            # cancelling first keeps the payer from being briefly over-committed
+            order = {"cancel": 0, "modify": 1, "create": 2}
+            plan.changes[pool] = sorted(changes, key=lambda change: order[change.action])
+
+        if runway is not None and rates:
+            needed = sum(rates.values()) * convert_duration(runway) // pool.internal_scale
+            balance = pool.contract.getPayerBalance(address)
+            if needed > balance:
+                plan.deposits[pool] = needed - balance
+
+    return plan
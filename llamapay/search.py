@@ -0,0 +1,138 @@
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Union
+
+from ape import networks
+from ape.logging import logger
+from ape.types import AddressType
+
+from llamapay.constants import FACTORY_DEPLOYMENTS, FactoryDeployment
+from llamapay.llamapay import Factory, convert_address
+from llamapay.solvency import PayerSolvency
+
+
+@dataclass
+class StreamMatch:
+    """
+    A stream found on one of the networks, tagged with where it lives.
+    """
+
+    ecosystem: str
+    network: str
+    chain_id: int
+    pool: AddressType
+    token: str
+    source: AddressType
+    target: AddressType
+    rate: int
+
+
+def search_networks(
+    *,
+    source: Optional[str] = None,
+    target: Optional[str] = None,
+    deployments: Optional[List[FactoryDeployment]] = None,
+    provider: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> List[StreamMatch]:
+    """
+    Find active streams by source and/or target on every network with a LlamaPay deployment.
+
+    Each network is searched in its own process with its own provider connection.
+    ENS names are resolved with the current connection before fanning out.
+    Networks which can't be reached are skipped with a warning.
+    """
+    if not (source or target):
+        raise ValueError("must specify source or target")
+    if source:
+        source = convert_address(source)
+    if target:
+        target = convert_address(target)
+    if deployments is None:
+        deployments = FACTORY_DEPLOYMENTS.__root__
+
+    matches = _fan_out(_search_network, deployments, workers, provider, source, target)
+    return sorted(matches, key=lambda match: (match.ecosystem, match.network, match.token))
+
+
+def solvency_networks(
+    *,
+    threshold: Optional[Union[int, str]] = None,
+    deployments: Optional[List[FactoryDeployment]] = None,
+    provider: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> List[PayerSolvency]:
+    """
+    Solvency report of every payer on every network with a LlamaPay deployment,
+    shortest runway first. Networks which can't be reached are skipped with a warning.
+    """
+    if deployments is None:
+        deployments = FACTORY_DEPLOYMENTS.__root__
+
+    rows = _fan_out(_network_solvency, deployments, workers, provider, threshold)
+    return sorted(rows, key=lambda row: row.runway)
+
+
+def _fan_out(function: Callable, deployments: List[FactoryDeployment], workers, *args) -> list:
+    """
+    Run `function(ecosystem, network, *args)` for each deployment in its own process.
+    """
+    results: list = []
+    # deployments added from a config may not say how to connect to their network
+    deployments = [item for item in deployments if item.ecosystem and item.network]
+    with ProcessPoolExecutor(workers) as executor:
+        futures = {
+            executor.submit(function, item.ecosystem, item.network, *args): item
+            for item in deployments
+        }
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                results.extend(future.result())
+            except sqlite3.Error:
+                # the local index failed, results would silently go missing
+                raise
+            except Exception as error:
+                logger.warning(f"skipping {item.ecosystem}:{item.network}: {error}")
+
+    return results
+
+
+def _connect(ecosystem: str, network: str, provider: Optional[str]):
+    choice = f"{ecosystem}:{network}" + (f":{provider}" if provider else "")
+    return networks.parse_network_choice(choice)
+
+
+def _search_network(
+    ecosystem: str,
+    network: str,
+    provider: Optional[str],
+    source: Optional[AddressType],
+    target: Optional[AddressType],
+) -> List[StreamMatch]:
+    with _connect(ecosystem, network, provider):
+        factory = Factory()
+        return [
+            StreamMatch(
+                ecosystem=ecosystem,
+                network=network,
+                chain_id=factory.chain_id,
+                pool=stream.pool.address,
+                token=stream.pool.symbol,
+                source=stream.source,
+                target=stream.target,
+                rate=stream.rate,
+            )
+            for stream in factory.find_streams(source=source, target=target)
+        ]
+
+
+def _network_solvency(
+    ecosystem: str,
+    network: str,
+    provider: Optional[str],
+    threshold: Optional[Union[int, str]],
+) -> List[PayerSolvency]:
+    with _connect(ecosystem, network, provider):
+        return Factory().solvency_report(threshold=threshold)
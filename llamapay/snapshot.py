@@ -0,0 +1,52 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import TYPE_CHECKING, List, Optional
+
+from ape.types import AddressType
+
+if TYPE_CHECKING:
+    from llamapay.llamapay import Stream
+
+
+@dataclass
+class Snapshot:
+    """
+    Columnar state of streams and payers in a pool, read at a single block.
+
+    Amounts are raw token values, divide them by `scale` to get tokens.
+    Values are `None` where the call has failed, for example for a cancelled stream.
+
+    `stream_starts` and `balances` are the raw contract state scaled by `internal_scale`,
+    they are enough to replicate the pool accounting off-chain with `llamapay.engine`.
+    """
+
+    block: int
+    timestamp: int
+    scale: int
+    internal_scale: int
+    streams: List["Stream"] = field(default_factory=list)
+    withdrawable: List[Optional[int]] = field(default_factory=list)
+    last_update: List[Optional[int]] = field(default_factory=list)
+    owed: List[Optional[int]] = field(default_factory=list)
+    stream_starts: List[Optional[int]] = field(default_factory=list)
+    payers: List[AddressType] = field(default_factory=list)
+    payer_balances: List[Optional[int]] = field(default_factory=list)
+    last_payer_update: List[Optional[int]] = field(default_factory=list)
+    total_paid_per_sec: List[Optional[int]] = field(default_factory=list)
+    balances: List[Optional[int]] = field(default_factory=list)
+
+    def stream_balances(self) -> List[Optional[Decimal]]:
+        """
+        Withdrawable balance of each stream in tokens, same as `Stream.balance`.
+        """
+        return [
+            None if value is None else Decimal(value) / self.scale for value in self.withdrawable
+        ]
+
+    def payer_token_balances(self) -> List[Optional[Decimal]]:
+        """
+        Balance of each payer in tokens, same as `Pool.get_balance`.
+        """
+        return [
+            None if value is None else Decimal(value) / self.scale for value in self.payer_balances
+        ]
@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import TYPE_CHECKING, List, Optional, Union
+
+import numpy as np
+from ape.types import AddressType
+
+from llamapay.constants import DURATION_TO_SECONDS, PRECISION
+from llamapay.engine import Engine
+from llamapay.snapshot import Snapshot
+
+if TYPE_CHECKING:
+    from llamapay.llamapay import Pool
+
+
+@dataclass
+class PayerSolvency:
+    """
+    How long a payer can keep funding their streams in one pool.
+    """
+
+    chain_id: int
+    pool: AddressType
+    token: str
+    payer: AddressType
+    # tokens left at the snapshot, negative when the payer is in debt
+    balance: Decimal
+    # tokens per second paid across all active streams
+    paid_per_sec: Decimal
+    # timestamp at which the balance runs out
+    insolvent_at: int
+    # seconds left from the snapshot, negative when already insolvent
+    runway: int
+
+
+def payer_solvency(pool: "Pool", snapshot: Snapshot) -> List[PayerSolvency]:
+    """
+    Time to insolvency of every payer with active streams in a snapshot, shortest runway first.
+    Payers whose calls have failed are left out.
+    """
+    complete = [
+        i
+        for i in range(len(snapshot.payers))
+        if None
+        not in (
+            snapshot.payer_balances[i],
+            snapshot.balances[i],
+            snapshot.last_payer_update[i],
+            snapshot.total_paid_per_sec[i],
+        )
+        and snapshot.total_paid_per_sec[i] != 0
+    ]
+    payers = Snapshot(
+        block=snapshot.block,
+        timestamp=snapshot.timestamp,
+        scale=snapshot.scale,
+        internal_scale=snapshot.internal_scale,
+        payers=[snapshot.payers[i] for i in complete],
+        payer_balances=[snapshot.payer_balances[i] for i in complete],
+        balances=[snapshot.balances[i] for i in complete],
+        last_payer_update=[snapshot.last_payer_update[i] for i in complete],
+        total_paid_per_sec=[snapshot.total_paid_per_sec[i] for i in complete],
+    )
+    engine = Engine(payers)
+    insolvent_at = engine.insolvency_time()
+    runway = insolvent_at - snapshot.timestamp
+    rows = []
+    for i in np.argsort(runway, kind="stable"):
+        rows.append(
+            PayerSolvency(
+                chain_id=pool.factory.chain_id,
+                pool=pool.address,
+                token=pool.symbol,
+                payer=payers.payers[i],
+                balance=Decimal(payers.payer_balances[i]) / snapshot.scale,
+                paid_per_sec=Decimal(payers.total_paid_per_sec[i]) / PRECISION,
+                insolvent_at=int(insolvent_at[i]),
+                runway=int(runway[i]),
+            )
+        )
+    return rows
+
+
+def convert_duration(duration: Union[int, str]) -> int:
+    """
+    Convert a duration like `2 weeks` or `month` into seconds, ints are taken as seconds.
+    """
+    if isinstance(duration, int):
+        return duration
+    if isinstance(duration, str):
+        amount, _, period = duration.strip().rpartition(" ")
+        period = period.rstrip("s")
+        if period in DURATION_TO_SECONDS:
+            return int(Decimal(amount or 1) * DURATION_TO_SECONDS[period])
+
+    raise ValueError("invalid duration")
+
+
+def within(rows: List[PayerSolvency], threshold: Optional[Union[int, str]]) -> List[PayerSolvency]:
+    """
+    Keep the payers which run out of funds within `threshold`.
+    """
+    if threshold is None:
+        return rows
+    seconds = convert_duration(threshold)
+    return [row for row in rows if row.runway <= seconds]
@@ -0,0 +1,276 @@
+import bisect
+import functools
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ape import networks
+from eth_abi import decode_abi
+from eth_utils import keccak
+
+from llamapay.multicall import AGGREGATE3
+
+# upper bounds of latency buckets in milliseconds
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+MIDDLEWARE_NAME = "llamapay_stats"
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect.bisect_left(BUCKETS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound}ms" for bound in BUCKETS] + [f">{BUCKETS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_ms": self.total,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "max_ms": self.max,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class Collector:
+    """
+    Request counters and latencies, either global or scoped to a block of code.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.rpc: Counter = Counter()
+        self.functions: Counter = Counter()
+        # calls made from inside multicall batches
+        self.batched: Counter = Counter()
+        self.latency: Dict[str, Histogram] = defaultdict(Histogram)
+        self.operations: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(
+        self,
+        method: str,
+        ms: float,
+        function: Optional[str],
+        batched: List[str],
+        operation: Optional[str],
+    ):
+        with self._lock:
+            self.rpc[method] += 1
+            self.latency[method].add(ms)
+            if function:
+                self.functions[function] += 1
+            self.batched.update(batched)
+            if operation:
+                self.operations[operation]["rpc"] += 1
+
+    def called(self, operation: str):
+        with self._lock:
+            self.operations[operation]["calls"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the counters, safe to keep while the counters move on.
+        """
+        with self._lock:
+            return {
+                "rpc": dict(self.rpc),
+                "functions": dict(self.functions),
+                "batched": dict(self.batched),
+                "latency": {method: hist.to_dict() for method, hist in self.latency.items()},
+                "operations": {name: dict(counts) for name, counts in self.operations.items()},
+            }
+
+
+GLOBAL = Collector()
+_scopes: List[Collector] = []
+_local = threading.local()
+_originals: Dict[tuple, Any] = {}
+_selectors: Dict[bytes, str] = {}
+
+
+def _load_selectors() -> Dict[bytes, str]:
+    if not _selectors:
+        from ape_tokens.managers import ERC20
+
+        from llamapay.constants import CONTRACT_TYPES
+
+        contract_types = {**CONTRACT_TYPES, "ERC20": ERC20}
+        for contract_name, contract_type in contract_types.items():
+            for abi in contract_type.abi:
+                if abi.type != "function":
+                    continue
+                signature = f"{abi.name}({','.join(item.type for item in abi.inputs)})"
+                # the first contract wins for shared signatures like `token()`
+                _selectors.setdefault(keccak(text=signature)[:4], f"{contract_name}.{abi.name}")
+        _selectors[AGGREGATE3] = "Multicall3.aggregate3"
+
+    return _selectors
+
+
+def _function(data: bytes) -> Optional[str]:
+    return _load_selectors().get(data[:4])
+
+
+def _describe_call(params) -> tuple:
+    """
+    Name of the contract function behind an `eth_call` and of the calls batched inside it.
+    """
+    try:
+        data = params[0].get("data") or params[0].get("input")
+        if isinstance(data, str):
+            data = bytes.fromhex(data[2:])
+        data = bytes(data)
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return None, []
+
+    function = _function(data)
+    batched = []
+    if data[:4] == AGGREGATE3:
+        try:
+            (calls,) = decode_abi(["(address,bool,bytes)[]"], data[4:])
+            batched = [_function(call_data) or call_data[:4].hex() for _, _, call_data in calls]
+        except Exception:
+            pass
+
+    return function or data[:4].hex(), batched
+
+
+def _current_operation() -> Optional[str]:
+    stack = getattr(_local, "operations", None)
+    return stack[0] if stack else None
+
+
+def stats_middleware(make_request: Callable, web3) -> Callable:
+    """
+    Web3 middleware which times every request and attributes it to the contract function
+    and the outermost `Factory`, `Pool` or `Stream` operation which made it.
+    """
+
+    def middleware(method, params):
+        start = time.perf_counter()
+        try:
+            return make_request(method, params)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            function, batched = None, []
+            if method in ("eth_call", "eth_estimateGas", "eth_sendTransaction"):
+                function, batched = _describe_call(params)
+            operation = _current_operation()
+            for collector in [GLOBAL, *_scopes]:
+                collector.record(method, ms, function, batched, operation)
+
+    return middleware
+
+
+def _track(name: str, func: Callable) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stack = getattr(_local, "operations", None)
+        if stack is None:
+            stack = _local.operations = []
+        if not stack:
+            for collector in [GLOBAL, *_scopes]:
+                collector.called(name)
+        stack.append(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stack.pop()
+
+    return wrapper
+
+
+def _instrumented_classes():
+    from llamapay.llamapay import Factory, Pool, Stream
+
+    return [Factory, Pool, Stream]
+
+
+def enabled() -> bool:
+    return bool(_originals)
+
+
+def enable():
+    """
+    Start counting requests. Installs the middleware on the current provider
+    and wraps public methods and properties of `Factory`, `Pool` and `Stream`.
+    """
+    web3 = networks.provider.web3  # type: ignore
+    if MIDDLEWARE_NAME not in web3.middleware_onion:
+        web3.middleware_onion.add(stats_middleware, name=MIDDLEWARE_NAME)
+    if enabled():
+        return
+
+    for cls in _instrumented_classes():
+        for name, attr in list(vars(cls).items()):
+            if name.startswith("_"):
+                continue
+            label = f"{cls.__name__}.{name}"
+            if isinstance(attr, property) and attr.fget is not None:
+                getter = _track(label, attr.fget)
+                wrapped: Any = property(getter, attr.fset, attr.fdel, attr.__doc__)
+            elif isinstance(attr, classmethod):
+                wrapped = classmethod(_track(label, attr.__func__))
+            elif callable(attr) and not isinstance(attr, type):
+                wrapped = _track(label, attr)
+            else:
+                continue
+            _originals[(cls, name)] = attr
+            setattr(cls, name, wrapped)
+
+
+def disable():
+    """
+    Stop counting requests and restore the original methods.
+    """
+    web3 = networks.provider.web3  # type: ignore
+    if MIDDLEWARE_NAME in web3.middleware_onion:
+        web3.middleware_onion.remove(MIDDLEWARE_NAME)
+    for (cls, name), attr in _originals.items():
+        setattr(cls, name, attr)
+    _originals.clear()
+
+
+def stats() -> Dict[str, Any]:
+    """
+    Counters collected since `enable` or the last `reset`.
+    """
+    return GLOBAL.stats()
+
+
+def reset():
+    GLOBAL.clear()
+
+
+@contextmanager
+def scope() -> Iterator[Collector]:
+    """
+    Count only the requests made inside a block of code, enabling instrumentation if needed.
+
+    >>> with scope() as counters:
+    ...     [stream.balance for stream in streams]
+    >>> counters.stats()["operations"]["Stream.balance"]
+    """
+    was_enabled = enabled()
+    enable()
+    collector = Collector()
+    _scopes.append(collector)
+    try:
+        yield collector
+    finally:
+        _scopes.remove(collector)
+        if not was_enabled:
+            disable()
@@ -0,0 +1,229 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from ape.types import ContractLog
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    chain_id INTEGER NOT NULL,
+    pool TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    block_hash TEXT,
+    transaction_hash TEXT,
+    name TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    PRIMARY KEY (chain_id, pool, block_number, log_index)
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    chain_id INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    PRIMARY KEY (chain_id, number)
+);
+CREATE TABLE IF NOT EXISTS deployments (
+    chain_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    PRIMARY KEY (chain_id, address)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    chain_id INTEGER NOT NULL,
+    pool TEXT NOT NULL,
+    last_block INTEGER NOT NULL,
+    PRIMARY KEY (chain_id, pool)
+);
+"""
+
+
+class LogStore:
+    """
+    Persistent on-disk index of decoded pool events.
+
+    Events are keyed by chain id, pool address and block, and each pool keeps a checkpoint
+    of the last fully indexed block, so a new process only needs to fetch the tail.
+
+    Several processes can share a file. Readers don't block the writer, and a writer waits
+    up to `timeout` seconds for another one to finish.
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:", timeout: float = 60.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=timeout, check_same_thread=False)
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def get_checkpoint(self, chain_id: int, pool: str) -> Optional[int]:
+        """
+        Last block fully indexed for a pool, or None if the pool was never indexed.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_block FROM checkpoints WHERE chain_id = ? AND pool = ?",
+                (chain_id, pool),
+            ).fetchone()
+        return row[0] if row else None
+
+    def load(self, chain_id: int, pool: str, stop_block: Optional[int] = None) -> List[ContractLog]:
+        """
+        Load stored events of a pool in block order, optionally up to and including `stop_block`.
+        """
+        return list(self.iter(chain_id, pool, stop_block=stop_block))
+
+    def iter(
+        self,
+        chain_id: int,
+        pool: str,
+        start_block: int = 0,
+        stop_block: Optional[int] = None,
+        names: Optional[Sequence[str]] = None,
+        page_size: int = 10_000,
+    ) -> Iterator[ContractLog]:
+        """
+        Iterate over stored events of a pool in block order, reading them page by page.
+        """
+        query = (
+            "SELECT block_number, log_index, block_hash, transaction_hash, name, arguments "
+            "FROM events WHERE chain_id = ? AND pool = ? AND (block_number, log_index) > (?, ?)"
+        )
+        params: list = [chain_id, pool]
+        filters = ""
+        if stop_block is not None:
+            filters += " AND block_number <= ?"
+            params.append(stop_block)
+        if names is not None:
+            filters += f" AND name IN ({', '.join('?' for _ in names)})"
+            params.extend(names)
+        query += filters + " ORDER BY block_number, log_index LIMIT ?"
+
+        cursor = (start_block, -1)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    query, [*params[:2], *cursor, *params[2:], page_size]
+                ).fetchall()
+
+            for block_number, log_index, block_hash, transaction_hash, name, arguments in rows:
+                yield ContractLog(
+                    name=name,
+                    contract_address=pool,
+                    event_arguments=json.loads(arguments, object_hook=_decode_bytes),
+                    transaction_hash=transaction_hash,
+                    block_number=block_number,
+                    block_hash=block_hash,
+                    log_index=log_index,
+                )
+
+            if len(rows) < page_size:
+                return
+            cursor = (rows[-1][0], rows[-1][1])
+
+    def save(self, chain_id: int, pool: str, logs: Iterable[ContractLog], last_block: int):
+        """
+        Store events and move the checkpoint of a pool to `last_block` in one transaction.
+        """
+        rows = [
+            (
+                chain_id,
+                pool,
+                log.block_number,
+                log.log_index,
+                _to_hex(log.block_hash),
+                _to_hex(log.transaction_hash),
+                log.name,
+                json.dumps(log.event_arguments, default=_encode_bytes),
+            )
+            for log in logs
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?)",
+                (chain_id, pool, last_block),
+            )
+
+    def truncate(self, chain_id: int, pool: str, from_block: int):
+        """
+        Drop events from `from_block` onwards and rewind the checkpoint before it.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM events WHERE chain_id = ? AND pool = ? AND block_number >= ?",
+                (chain_id, pool, from_block),
+            )
+            self._conn.execute(
+                "UPDATE checkpoints SET last_block = MIN(last_block, ?) "
+                "WHERE chain_id = ? AND pool = ?",
+                (from_block - 1, chain_id, pool),
+            )
+
+    def get_timestamps(self, chain_id: int, numbers: Sequence[int]) -> Dict[int, int]:
+        """
+        Stored timestamps of the blocks which are known, keyed by block number.
+        """
+        timestamps: Dict[int, int] = {}
+        # stay under the sqlite limit of bound parameters
+        for i in range(0, len(numbers), 500):
+            chunk = numbers[i : i + 500]
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT number, timestamp FROM blocks WHERE chain_id = ? "
+                    f"AND number IN ({', '.join('?' for _ in chunk)})",
+                    [chain_id, *chunk],
+                ).fetchall()
+            timestamps.update(rows)
+        return timestamps
+
+    def save_timestamps(self, chain_id: int, timestamps: Dict[int, int]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)",
+                [(chain_id, number, timestamp) for number, timestamp in timestamps.items()],
+            )
+
+    def get_deploy_block(self, chain_id: int, address: str) -> Optional[int]:
+        """
+        Creation block of a contract, or None if it was never looked up.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT block_number FROM deployments WHERE chain_id = ? AND address = ?",
+                (chain_id, address),
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_deploy_block(self, chain_id: int, address: str, block_number: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO deployments VALUES (?, ?, ?)",
+                (chain_id, address, block_number),
+            )
+
+
+def _to_hex(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return "0x" + value.hex()
+    return str(value)
+
+
+def _encode_bytes(value):
+    if isinstance(value, bytes):
+        return {"$bytes": value.hex()}
+    raise TypeError(f"cannot serialize {type(value).__name__}")
+
+
+def _decode_bytes(obj):
+    if set(obj) == {"$bytes"}:
+        return bytes.fromhex(obj["$bytes"])
+    return obj
@@ -0,0 +1,181 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterator, List, Optional
+
+from ape.types import ContractLog
+from ape.utils import ManagerAccessMixin
+
+from llamapay.constants import REORG_DEPTH
+
+if TYPE_CHECKING:
+    from llamapay.llamapay import Pool, Stream
+
+
+class EventKind(Enum):
+    CREATED = "created"
+    MODIFIED = "modified"
+    PAUSED = "paused"
+    CANCELLED = "cancelled"
+    WITHDRAWN = "withdrawn"
+
+
+@dataclass
+class StreamEvent:
+    """
+    A change in the lifecycle of a stream.
+    """
+
+    kind: EventKind
+    stream: "Stream"
+    log: ContractLog
+    # the stream which was replaced, only for modifications
+    previous: Optional["Stream"] = None
+    # raw token amount, only for withdrawals
+    amount: Optional[int] = None
+    # the event was undone by a chain reorganization
+    removed: bool = False
+
+
+KINDS = {
+    "StreamCreated": EventKind.CREATED,
+    "StreamCreatedWithReason": EventKind.CREATED,
+    "StreamModified": EventKind.MODIFIED,
+    "StreamPaused": EventKind.PAUSED,
+    "StreamCancelled": EventKind.CANCELLED,
+    "Withdraw": EventKind.WITHDRAWN,
+}
+
+
+def stream_event(pool: "Pool", log: ContractLog, removed: bool = False) -> Optional[StreamEvent]:
+    """
+    Convert a pool log into a stream event, or None if it's not about a stream.
+    """
+    from llamapay.llamapay import Stream
+
+    kind = KINDS.get(log.name)
+    if kind is None:
+        return None
+
+    args = log.event_arguments
+    stream = Stream.trusted(args["from"], args["to"], args["amountPerSec"], pool)
+    event = StreamEvent(kind=kind, stream=stream, log=log, removed=removed)
+    if kind == EventKind.MODIFIED:
+        event.previous = Stream.trusted(args["from"], args["oldTo"], args["oldAmountPerSec"], pool)
+    if kind == EventKind.WITHDRAWN:
+        event.amount = args["amount"]
+    return event
+
+
+class Watcher(ManagerAccessMixin):
+    """
+    Incrementally index a pool and emit stream events from confirmed blocks.
+
+    Recent block hashes are tracked, and when one of them changes the affected range
+    is rolled back in the stream index and replayed from the new chain.
+    """
+
+    def __init__(self, pool: "Pool", confirmations: int = 6, poll_interval: float = 5.0):
+        self.pool = pool
+        self.poll_interval = poll_interval
+        pool.confirmations = confirmations
+        pool._journal = True
+        # blocks indexed before without confirmations have no journal and couldn't be rolled back
+        stop = self.chain_manager.blocks.height - confirmations
+        if pool._last_logs_block is not None and pool._last_logs_block > stop + 1:
+            pool._reindex(stop + 1)
+        # catch up silently, only new blocks produce events
+        pool._refresh_logs()
+        self._hashes: Dict[int, str] = {}
+        self._recent: Deque[ContractLog] = deque()
+        self._buffer: List[ContractLog] = []
+        pool._listeners.append(self._buffer.extend)
+        assert pool._last_logs_block is not None
+        self._remember(pool._last_logs_block - 1)
+
+    def _block_hash(self, number: int) -> str:
+        return _hex(self.provider.get_block(number).hash)
+
+    def _remember(self, number: int, block_hash: Optional[str] = None):
+        self._hashes[number] = block_hash or self._block_hash(number)
+
+    def _find_fork(self) -> Optional[int]:
+        """
+        First block which needs to be replayed, or None if the tracked blocks are unchanged.
+        """
+        fork = None
+        for number in sorted(self._hashes, reverse=True):
+            if self._block_hash(number) == self._hashes[number]:
+                break
+            # the chain could have diverged anywhere after the last matching block
+            fork = number
+            previous = [block for block in self._hashes if block < number]
+            if previous:
+                fork = max(previous) + 1
+        return fork
+
+    def _rollback(self, fork: int) -> List[StreamEvent]:
+        removed = []
+        while self._recent and self._recent[-1].block_number >= fork:
+            event = stream_event(self.pool, self._recent.pop(), removed=True)
+            if event:
+                removed.append(event)
+
+        self.pool._rollback(fork)
+        self._hashes = {number: value for number, value in self._hashes.items() if number < fork}
+        return removed
+
+    def poll(self) -> List[StreamEvent]:
+        """
+        Check for reorganizations and index newly confirmed blocks.
+        """
+        events = []
+        fork = self._find_fork()
+        if fork is not None:
+            events.extend(self._rollback(fork))
+
+        self.pool._refresh_logs()
+        logs, self._buffer[:] = self._buffer[:], []
+        for log in logs:
+            self._recent.append(log)
+            self._remember(log.block_number, _hex(log.block_hash))
+            event = stream_event(self.pool, log)
+            if event:
+                events.append(event)
+
+        assert self.pool._last_logs_block is not None
+        last = self.pool._last_logs_block - 1
+        if last not in self._hashes:
+            self._remember(last)
+
+        # anything deeper than the reorg window is final
+        floor = last - REORG_DEPTH
+        self.pool._index.prune(floor)
+        while self._recent and self._recent[0].block_number < floor:
+            self._recent.popleft()
+        self._hashes = {number: value for number, value in self._hashes.items() if number >= floor}
+        return events
+
+    def __iter__(self) -> Iterator[StreamEvent]:
+        while True:
+            yield from self.poll()
+            time.sleep(self.poll_interval)
+
+    def run(self, callback: Callable[[StreamEvent], None]):
+        for event in self:
+            callback(event)
+
+    def close(self):
+        """
+        Stop following the pool and return it to indexing up to the head.
+        """
+        self.pool._listeners.remove(self._buffer.extend)
+        self.pool.confirmations = 0
+        self.pool._journal = False
+
+
+def _hex(value) -> str:
+    if isinstance(value, bytes):
+        return "0x" + value.hex()
+    return str(value).lower()
@@ -19,6 +19,9 @@ extras_require = {
         "wheel",  # Packaging tool
         "twine",  # Package upload tool
     ],
+    "export": [
+        "pyarrow>=7.0",  # Parquet export
+    ],
     "dev": [
         "commitizen",  # Manage commits and publishing releases
         "pre-commit",  # Ensure that linters are run prior to commiting
@@ -56,6 +59,7 @@ setup(
         "ape-tokens>=0.2.0",
         "ape-ens>=0.2.0",
         "eth-ape>=0.2.7.dev",
+        "numpy>=1.21",
     ],  # NOTE: Add 3rd party libraries here
     python_requires=">=3.7,<4",
     extras_require=extras_require,
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+from llamapay.aio import AsyncFactory
+
+
+def test_async_pool(factory, pool):
+    async def main():
+        async with AsyncFactory(factory) as async_factory:
+            async_pool = await async_factory.get_pool("DAI")
+            assert async_pool.pool == pool
+            assert await async_factory.get_pool("DAI") is async_pool
+            assert await async_pool.symbol() == "DAI"
+
+    asyncio.run(main())
+
+
+def test_async_balances(factory, pool, stream, bird, chain, token):
+    pool.deposit("1000 DAI", sender=bird)
+    stream.create(sender=bird)
+    chain.mine()
+
+    async def main():
+        async with AsyncFactory(factory, max_workers=4) as async_factory:
+            async_pool = await async_factory.get_pool("DAI")
+            balances = await asyncio.gather(*[async_pool.balance(stream) for _ in range(100)])
+            (balance,) = await async_pool.balances([stream])
+            streams = await async_factory.find_streams(source=stream.source)
+            return balances, balance, streams
+
+    balances, balance, streams = asyncio.run(main())
+    assert len(set(balances)) == 1
+    assert balance == stream.balance
+    assert stream in streams
+
+
+def test_coalesce_inflight(factory):
+    calls = []
+
+    def slow():
+        calls.append(threading.get_ident())
+        time.sleep(0.1)
+        return len(calls)
+
+    async def main():
+        async with AsyncFactory(factory) as async_factory:
+            same = await asyncio.gather(*[async_factory.run(slow, key="slow") for _ in range(50)])
+            other = await async_factory.run(slow, key="slow")
+            return same, other
+
+    same, other = asyncio.run(main())
+    assert same == [1] * 50
+    assert other == 2
+
+
+def test_concurrent_pool_loading():
+    # a fresh factory, so the pools are loaded by concurrent threads
+    async def main():
+        async with AsyncFactory() as async_factory:
+            results = await asyncio.gather(
+                *[async_factory.get_pools(["DAI"]) for _ in range(8)], async_factory.pools()
+            )
+            return async_factory.factory, results
+
+    factory, results = asyncio.run(main())
+    assert len({id(pools["DAI"].pool) for pools in results[:-1]}) == 1
+    assert len(factory._pools) == len(results[-1])
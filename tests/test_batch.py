@@ -0,0 +1,65 @@
+import ape
+import pytest
+
+
+def test_batch_create(pool, bird, bee, token):
+    pool.deposit("1000 DAI", sender=bird)
+    streams = [pool.make_stream(bird, bee, 10**18 + i) for i in range(5)]
+    with pool.batch(sender=bird) as batch:
+        for stream in streams:
+            batch.create(stream)
+
+    assert [result.stream for result in batch.results] == streams
+    assert all(result.success for result in batch.results)
+    # everything fits into a single transaction
+    assert len({result.receipt.txn_hash for result in batch.results}) == 1
+    for stream in streams:
+        assert pool.contract.streamToStart(stream.id) > 0
+
+
+def test_batch_split_by_gas(pool, bird, bee, token):
+    pool.deposit("1000 DAI", sender=bird)
+    streams = [pool.make_stream(bird, bee, 2 * 10**18 + i) for i in range(4)]
+    with pool.batch(sender=bird, gas_limit=200_000) as batch:
+        for stream in streams:
+            batch.create(stream)
+
+    assert all(result.success for result in batch.results)
+    assert len({result.receipt.txn_hash for result in batch.results}) == 2
+
+
+def test_batch_partial_failure(pool, bird, bee, token):
+    pool.deposit("1000 DAI", sender=bird)
+    stream = pool.make_stream(bird, bee, 3 * 10**18)
+    missing = pool.make_stream(bird, bee, 3 * 10**18 + 1)
+    new_stream = pool.make_stream(bird, bee, 6 * 10**18)
+    with pool.batch(sender=bird) as batch:
+        batch.create(stream)
+        batch.cancel(missing)
+        batch.send(stream)
+        batch.replace(stream, new_stream)
+
+    assert [result.success for result in batch.results] == [True, False, True, True]
+
+
+def test_batch_revert_on_fail(pool, bird, bee):
+    missing = pool.make_stream(bird, bee, 4 * 10**18)
+    with ape.reverts():
+        with pool.batch(revert_on_fail=True, sender=bird) as batch:
+            batch.cancel(missing)
+
+
+def test_batch_rejects_conflicts(pool, bird, bee):
+    stream = pool.make_stream(bird, bee, 5 * 10**18)
+    new_stream = pool.make_stream(bird, bee, 10 * 10**18)
+    batch = pool.batch(sender=bird)
+    batch.create(stream)
+    with pytest.raises(ValueError):
+        batch.create(stream)
+
+    batch.replace(stream, new_stream)
+    with pytest.raises(ValueError):
+        batch.cancel(stream)
+    with pytest.raises(ValueError):
+        batch.create(new_stream)
+    assert [operation.name for operation in batch.operations] == ["create", "replace"]
@@ -0,0 +1,52 @@
+import pytest
+
+from llamapay.cache import TTLCache, cache_stats
+
+
+def test_ttl_cache_lru():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    # b was the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats() == {"hits": 2, "misses": 1, "size": 2}
+
+
+def test_ttl_cache_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("llamapay.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 11
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_does_not_cache_errors():
+    cache = TTLCache()
+
+    def fail():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        cache.get_or_set("a", fail)
+    assert cache.get_or_set("a", lambda: 1) == 1
+
+
+def test_factory_pool_identity(factory):
+    pool = factory.get_pool("DAI")
+    assert factory.get_pool("DAI") is pool
+    assert factory.get_pool(pool.token.address) is pool
+    assert pool in factory.pools
+    assert next(item for item in factory.pools if item == pool) is pool
+
+
+def test_repeated_lookups_hit_cache(factory, pool):
+    pool.symbol
+    before = cache_stats()["tokens"]["hits"]
+    factory.get_pool("DAI")
+    assert cache_stats()["tokens"]["hits"] == before + 1
@@ -0,0 +1,23 @@
+from llamapay.constants import CONTRACT_TYPES, ContractTypes
+
+
+def test_contract_types_cache(tmp_path):
+    contract_types = ContractTypes(cache_dir=tmp_path)
+    assert contract_types._types is None
+    assert set(contract_types) == {"LlamaPay", "LlamaPayFactory"}
+    (cached,) = tmp_path.glob("contract_types-*.json")
+
+    reloaded = ContractTypes(cache_dir=tmp_path)
+    assert reloaded["LlamaPay"] == CONTRACT_TYPES["LlamaPay"]
+    assert reloaded["LlamaPayFactory"].abi == contract_types["LlamaPayFactory"].abi
+
+
+def test_contract_types_broken_cache(tmp_path):
+    ContractTypes(cache_dir=tmp_path)["LlamaPay"]
+    (cached,) = tmp_path.glob("contract_types-*.json")
+    cached.write_bytes(b"not json")
+
+    # a broken cache file is parsed again and replaced
+    assert ContractTypes(cache_dir=tmp_path)["LlamaPay"] == CONTRACT_TYPES["LlamaPay"]
+    assert ContractTypes(cache_dir=tmp_path)["LlamaPay"] == CONTRACT_TYPES["LlamaPay"]
+    assert cached.read_bytes() != b"not json"
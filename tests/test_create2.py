@@ -0,0 +1,28 @@
+from eth_utils import keccak
+
+from llamapay.create2 import create2_address, init_code_candidates, token_salt
+
+METADATA = b"\xa2\x64ipfs\x58\x22" + bytes(34) + b"\x64solc\x43\x00\x08\x0d\x00\x33"
+
+
+def test_create2_address():
+    # uniswap v2 usdc/weth pair
+    usdc = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+    weth = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+    salt = keccak(bytes.fromhex(usdc[2:]) + bytes.fromhex(weth[2:]))
+    init_code_hash = bytes.fromhex(
+        "96e8ac4277198ff8b6f785478aa9a39f403cb768dd02cbee326c3e7da348845f"
+    )
+    address = create2_address("0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f", salt, init_code_hash)
+    assert address == "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc"
+
+
+def test_token_salt():
+    salt = token_salt("0x6B175474E89094C44Da98b954EedeAC495271d0F")
+    assert salt == bytes(12) + bytes.fromhex("6B175474E89094C44Da98b954EedeAC495271d0F")
+
+
+def test_init_code_candidates():
+    creation_code = b"\x60\x80\x60\x40\x52" + b"\x5b" * 100 + METADATA
+    deployer_code = b"\x60\x80\x60\x40\x52" + b"\x01" * 50 + creation_code + METADATA
+    assert keccak(creation_code) in set(init_code_candidates(deployer_code))
@@ -0,0 +1,33 @@
+from llamapay.engine import Engine
+
+
+def test_engine_matches_contract(pool, stream, bird, bee, token, chain):
+    pool.deposit("1000 DAI", sender=bird)
+    stream.create(sender=bird)
+    other = pool.make_stream(bird, bee, stream.rate * 3)
+    other.create(sender=bird)
+    chain.mine()
+
+    engine = Engine(pool.snapshot(streams=[stream, other]))
+    chain.mine(5)
+    later = pool.snapshot(streams=[stream, other])
+
+    projection = engine.at(later.timestamp)
+    assert list(projection.withdrawable) == later.withdrawable
+    assert list(projection.last_update) == later.last_update
+    assert list(projection.owed) == later.owed
+
+
+def test_engine_insolvency(pool, stream, bird, token, chain):
+    pool.deposit("1 DAI", sender=bird)
+    stream.create(sender=bird)
+    snapshot = pool.snapshot(streams=[stream])
+    engine = Engine(snapshot)
+
+    (insolvent_at,) = engine.insolvency_time()
+    assert insolvent_at > snapshot.timestamp
+
+    # once the payer runs out, the stream stops accruing and the rest is owed
+    projection = engine.at(insolvent_at + 1000)
+    assert projection.last_update[0] == insolvent_at
+    assert projection.owed[0] > 0
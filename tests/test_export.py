@@ -0,0 +1,40 @@
+import csv
+
+import pytest
+
+from llamapay.export import COLUMNS, Exporter
+
+
+def test_export_csv(pool, chain, tmp_path):
+    stop = pool.factory.deploy_block + 200_000
+    exporter = Exporter(tmp_path, batch_size=100)
+    written = exporter.export_pool(pool, stop=stop)
+    assert written > 0
+
+    (path,) = tmp_path.glob("*/*.csv")
+    with path.open() as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == written
+    assert list(rows[0]) == COLUMNS
+    assert [int(row["block_number"]) for row in rows] == sorted(
+        int(row["block_number"]) for row in rows
+    )
+    assert all(row["timestamp"] for row in rows)
+
+    # a rerun only picks up the new blocks
+    assert Exporter(tmp_path).export_pool(pool, stop=stop) == 0
+
+    # rows a crashed run wrote after the saved state are taken back
+    with path.open("a") as f:
+        f.write("not,a,saved,row\n")
+    assert Exporter(tmp_path).export_pool(pool, stop=stop) == 0
+    with path.open() as f:
+        assert len(list(csv.DictReader(f))) == written
+
+
+def test_export_parquet(pool, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    stop = pool.factory.deploy_block + 200_000
+    written = Exporter(tmp_path, format="parquet").export_pool(pool, stop=stop)
+    table = pq.read_table(next(tmp_path.glob("*/*/")))
+    assert table.num_rows == written
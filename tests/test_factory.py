@@ -3,7 +3,11 @@ import pytest
 from ape.exceptions import ConversionError
 from ape_tokens import tokens
 
-from llamapay.exceptions import PoolNotDeployed
+from llamapay import Factory
+from llamapay.blocks import find_deploy_block
+from llamapay.constants import FACTORY_DEPLOYMENTS
+from llamapay.exceptions import CallFailed, PoolNotDeployed, UnsupportedNetwork
+from llamapay.multicall import Multicall
 
 
 def test_factory_get_pool(factory):
@@ -33,3 +37,75 @@ def test_create_pool_non_token(factory, bird, bee):
 
 def test_pools(factory):
     assert len(factory.pools) >= 1
+
+
+def test_factory_find_streams(factory, pool, bird, bee):
+    stream = pool.make_stream(bird, bee, 5 * 10**18)
+    stream.create(sender=bird)
+    streams = factory.find_streams(source=bird)
+    assert stream in streams
+    assert all(found.source == bird.address for found in streams)
+
+
+def test_deployments_by_chain_id(factory):
+    assert FACTORY_DEPLOYMENTS.by_chain_id(1) == factory.deployment
+    assert FACTORY_DEPLOYMENTS.get("ethereum", "mainnet") == factory.deployment
+    with pytest.raises(UnsupportedNetwork):
+        FACTORY_DEPLOYMENTS.by_chain_id(999_999)
+
+
+def test_deployments_from_config(tmp_path):
+    config = tmp_path / "ape-config.yaml"
+    config.write_text(
+        "llamapay:\n"
+        "  deployments:\n"
+        "    - chain_id: 1\n"
+        "      address: '0x0000000000000000000000000000000000000001'\n"
+    )
+    deployments = FACTORY_DEPLOYMENTS.with_config(config)
+    assert deployments.by_chain_id(1).address == "0x0000000000000000000000000000000000000001"
+    assert deployments.by_chain_id(1).deploy_block is None
+    assert FACTORY_DEPLOYMENTS.by_chain_id(1).deploy_block == 14_676_643
+
+
+def test_find_deploy_block(factory, chain):
+    address = factory.deployment.address
+    web3 = chain.provider.web3
+    assert web3.eth.get_code(address, block_identifier=factory.deploy_block)
+    assert not web3.eth.get_code(address, block_identifier=factory.deploy_block - 1)
+    assert find_deploy_block(address) == factory.deploy_block
+    assert find_deploy_block(address, hint=factory.deploy_block + 1000) == factory.deploy_block
+
+
+def test_predict_pool_address(factory):
+    for token in ["DAI", "UST", "0x0000000000000000000000000000000000000001"]:
+        address = factory.contract.getLlamaPayContractByToken(factory._resolve_token(token))[0]
+        assert factory.predict_pool_address(token) == address
+    assert factory.init_code_hash is not None
+
+
+def test_get_pools(factory, pool):
+    pools = factory.get_pools(["DAI", "UST", "0x0000000000000000000000000000000000000001"])
+    assert pools == {"DAI": pool, "UST": None, "0x0000000000000000000000000000000000000001": None}
+
+
+def test_get_pools_predicts_addresses(monkeypatch):
+    names = []
+    original = Multicall.__call__
+
+    def record(self, calls, block=None):
+        names.extend(call.name for call in calls)
+        return original(self, calls, block)
+
+    monkeypatch.setattr(Multicall, "__call__", record)
+    factory = Factory()
+    assert factory.get_pools(["DAI", "UST"])["UST"] is None
+    # only the address without a pool is checked with the factory
+    assert names.count("getLlamaPayContractByToken") == 1
+
+
+def test_get_pools_failed_lookup(factory, monkeypatch):
+    # a failed call is an error, not a pool which isn't deployed
+    monkeypatch.setattr(Multicall, "__call__", lambda self, calls, block=None: [None] * len(calls))
+    with pytest.raises(CallFailed):
+        factory.get_pool("0x0000000000000000000000000000000000000002")
@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+
+from llamapay.constants import REORG_DEPTH
+from llamapay.history import StreamHistory, by_payer, to_timestamp
+
+
+def test_to_timestamp():
+    assert to_timestamp(datetime(2022, 1, 1)) == 1640995200
+    assert to_timestamp(datetime(2022, 1, 1, tzinfo=timezone.utc)) == 1640995200
+    assert to_timestamp(1640995200) == 1640995200
+
+
+def test_streams_at(pool, stream, bird, chain):
+    before = chain.blocks.height
+    stream.create(sender=bird)
+    created = chain.blocks.height
+    chain.mine(3)
+    stream.pause(sender=bird)
+    paused = chain.blocks.height
+
+    assert stream not in pool.streams_at(before)
+    assert stream in pool.streams_at(created)
+    assert stream not in pool.streams_at(paused)
+    timestamp = chain.provider.get_block(created).timestamp
+    assert stream in pool.streams_at(timestamp=timestamp)
+
+
+def test_accrued_between(pool, stream, bird, chain):
+    stream.create(sender=bird)
+    start = chain.provider.get_block("latest").timestamp
+    chain.mine(5)
+    stream.cancel(sender=bird)
+    end = chain.provider.get_block("latest").timestamp
+
+    accruals = [item for item in pool.accrued_between(start, end + 100) if item.stream == stream]
+    (accrual,) = accruals
+    assert accrual.seconds == end - start
+    assert accrual.amount == (end - start) * stream.rate // pool.internal_scale
+    assert by_payer(accruals) == {stream.source: accrual.amount}
+
+
+def test_history_checkpoints(pool):
+    # a fresh history with small checkpoints answers the same as the cached one
+    history = StreamHistory(pool, checkpoint_every=10)
+    history.update()
+    block = (history.last_block + pool.factory.deploy_block) // 2
+    assert history.streams_at(block) == pool.streams_at(block)
+
+
+def test_history_drops_unsafe_blocks(pool, stream, bird, chain):
+    history = StreamHistory(pool, checkpoint_every=1)
+    history.update()
+    intervals, changes = len(history.ids), len(history._changes)
+    stream.create(sender=bird)
+    chain.mine(3)
+    stream.cancel(sender=bird)
+
+    history.update()
+    assert len(history.ids) == intervals + 1
+    # the recent blocks are replaced on every update instead of being added twice
+    history.update()
+    assert len(history.ids) == intervals + 1
+    assert len(history._changes) == changes + 2
+    assert len(history._checkpoints) == changes + 2
+
+    history._drop_tail()
+    assert len(history.ids) == intervals
+    assert len(history._checkpoints) == changes
+    assert history.last_block == chain.blocks.height - REORG_DEPTH
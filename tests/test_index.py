@@ -0,0 +1,103 @@
+from ape.types import ContractLog
+
+from llamapay import Stream
+from llamapay.index import StreamIndex, StreamStatus, StreamTable
+
+BIRD = "0x0000000000000000000000000000000000000002"
+BEE = "0x0000000000000000000000000000000000000003"
+WASP = "0x0000000000000000000000000000000000000004"
+
+
+def make_log(name, **event_arguments):
+    return ContractLog(
+        name=name,
+        contract_address=BIRD,
+        event_arguments=event_arguments,
+        transaction_hash="0x" + "ab" * 32,
+        block_number=1,
+        block_hash="0x" + "cd" * 32,
+        log_index=0,
+    )
+
+
+def stream_event(name, stream, **extra):
+    return make_log(
+        name,
+        **{"from": stream.source, "to": stream.target, "amountPerSec": stream.rate},
+        streamId=stream.id,
+        **extra,
+    )
+
+
+def test_index_lifecycle(pool):
+    index = StreamIndex(pool)
+    stream = pool.make_stream(BIRD, BEE, 10**18)
+
+    index.apply(stream_event("StreamCreated", stream))
+    assert index.status(stream.id) == StreamStatus.ACTIVE
+    assert index.find(source=BIRD) == [stream]
+
+    index.apply(stream_event("StreamPaused", stream))
+    assert index.status(stream.id) == StreamStatus.PAUSED
+    assert index.find(source=BIRD) == []
+    assert index.find(source=BIRD, status=StreamStatus.PAUSED) == [stream]
+
+    # resuming a paused stream creates it again with the same id
+    index.apply(stream_event("StreamCreated", stream))
+    assert index.find(target=BEE) == [stream]
+
+    index.apply(stream_event("StreamCancelled", stream))
+    assert index.find(source=BIRD, target=BEE) == []
+    assert index.find(source=BIRD, status=None) == [stream]
+    assert len(index) == 1
+
+
+def test_index_modify(pool):
+    index = StreamIndex(pool)
+    old = pool.make_stream(BIRD, BEE, 10**18)
+    new = pool.make_stream(BIRD, WASP, 2 * 10**18)
+
+    index.apply(stream_event("StreamCreatedWithReason", old, reason="salary"))
+    index.apply(
+        make_log(
+            "StreamModified",
+            **{"from": BIRD, "oldTo": BEE, "to": WASP},
+            oldAmountPerSec=old.rate,
+            oldStreamId=old.id,
+            amountPerSec=new.rate,
+            newStreamId=new.id,
+        )
+    )
+    assert index.status(old.id) == StreamStatus.CANCELLED
+    assert index.find(source=BIRD) == [new]
+    assert index.find(target=BEE) == []
+    assert index.find(source=BIRD, target=WASP) == [new]
+
+
+def test_find_streams_only_live(pool, bird, bee):
+    stream = pool.make_stream(bird, bee, 3 * 10**18)
+    stream.create(sender=bird)
+    assert stream in pool.find_streams(source=bird)
+    assert stream.status == StreamStatus.ACTIVE
+
+    stream.cancel(sender=bird)
+    assert stream not in pool.find_streams(source=bird)
+    assert stream in pool.find_streams(source=bird, status=StreamStatus.CANCELLED)
+
+
+def test_stream_table():
+    table = StreamTable()
+    assert table.upsert(b"\x01", BIRD, BEE, 10**18, 0) == 0
+    assert table.upsert(b"\x02", BIRD, WASP, 2 * 10**18, 0) == 1
+    assert table.upsert(b"\x01", BIRD, BEE, 10**18, 2) == 0
+    assert len(table) == 2
+    # each address is stored once
+    assert table.addresses == [BIRD, BEE, WASP]
+    assert table.source(1) == BIRD
+    assert table.target(1) == WASP
+    assert table.status(0) == StreamStatus.CANCELLED
+
+
+def test_stream_trusted(pool):
+    stream = pool.make_stream(BIRD, BEE, "1000 DAI/month")
+    assert Stream.trusted(stream.source, stream.target, stream.rate, pool) == stream
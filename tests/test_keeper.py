@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+from llamapay.keeper import Keeper
+
+
+def test_keeper_threshold(pool, stream, bird, bee, token, chain):
+    pool.deposit("1000 DAI", sender=bird)
+    stream.create(sender=bird)
+    chain.mine(10)
+
+    skipping = Keeper([pool], thresholds={"DAI": "1000 DAI"}, sources=[bird], sender=bird)
+    assert stream in skipping.due(pool).skipped
+
+    keeper = Keeper([pool], thresholds={"DAI": Decimal("0.01")}, sources=[bird], sender=bird)
+    before = token.balanceOf(bee)
+    report = keeper.run_once()
+    assert report.sent == [stream]
+    assert report.failed == []
+    assert token.balanceOf(bee) > before
+
+
+def test_keeper_max_age(pool, stream, bird, token, chain):
+    pool.deposit("1000 DAI", sender=bird)
+    stream.create(sender=bird)
+    chain.mine(10)
+
+    # no threshold for the token, only the age counts
+    keeper = Keeper([pool], max_age=1, sources=[bird], sender=bird)
+    assert keeper.due(pool).sent == [stream]
+    keeper = Keeper([pool], max_age="week", sources=[bird], sender=bird)
+    assert keeper.due(pool).sent == []
@@ -0,0 +1,62 @@
+import time
+
+from llamapay.logs import LogFetcher
+
+
+def test_fetcher_matches_provider(factory, pool, chain):
+    start = factory.deploy_block
+    stop = start + 200_000
+    events = pool.contract.contract_type.events
+    expected = list(
+        chain.provider.get_contract_logs(
+            pool.address, events, start_block=start, stop_block=stop, block_page_size=10_000
+        )
+    )
+    fetcher = LogFetcher(pool.address, events, page_size=5_000, workers=4)
+    pages = list(fetcher.fetch(start, stop))
+
+    # pages cover the range without gaps and arrive in order
+    assert pages[0].start == start
+    assert pages[-1].stop == stop
+    assert all(a.stop + 1 == b.start for a, b in zip(pages, pages[1:]))
+
+    logs = [log for page in pages for log in page.logs]
+    assert [(log.name, log.block_number) for log in logs] == [
+        (log.name, log.block_number) for log in expected
+    ]
+    assert [log.event_arguments for log in logs] == [log.event_arguments for log in expected]
+
+
+def test_fetcher_shrinks_pages(pool, chain, monkeypatch):
+    fetcher = LogFetcher(pool.address, pool.contract.contract_type.events, page_size=100_000)
+    get_logs = fetcher._get_logs
+
+    def limited(start, stop, attempt):
+        if stop - start > 1_000:
+            raise ValueError("query returned more than 10000 results")
+        return get_logs(start, stop, attempt)
+
+    monkeypatch.setattr(fetcher, "_get_logs", limited)
+    head = chain.blocks.height
+    pages = list(fetcher.fetch(head - 5_000, head))
+    assert all(page.stop - page.start <= 1_000 for page in pages)
+    assert pages[-1].stop == head
+
+
+def test_fetcher_bounds_ready_pages(pool, monkeypatch):
+    fetcher = LogFetcher(pool.address, [], page_size=10, workers=2, max_ready=4)
+    fetched = []
+
+    def slow_first_page(start, stop, attempt):
+        if start == 0 and attempt < 3:
+            time.sleep(0.05)
+            raise ConnectionError("connection reset")
+        fetched.append(start)
+        return []
+
+    monkeypatch.setattr(fetcher, "_get_logs", slow_first_page)
+    pages = fetcher.fetch(0, 9_999)
+    assert next(pages).start == 0
+    # later pages stopped piling up while the first one was retried
+    assert len(fetched) <= fetcher.max_ready + fetcher.workers
+    assert list(pages)[-1].stop == 9_999
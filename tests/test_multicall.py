@@ -0,0 +1,97 @@
+import pytest
+
+from llamapay.cache import TOKEN_METADATA
+from llamapay.constants import CONTRACT_TYPES
+from llamapay.multicall import Call, Multicall
+
+
+def pool_calls(pool):
+    return [
+        Call.from_abi(pool.address, CONTRACT_TYPES["LlamaPay"], "token"),
+        Call.from_abi(pool.address, CONTRACT_TYPES["LlamaPay"], "DECIMALS_DIVISOR"),
+        Call.from_abi(pool.address, CONTRACT_TYPES["LlamaPay"], "payers", pool.address),
+        # reverts, a stream from a pool to itself doesn't exist
+        Call.from_abi(
+            pool.address, CONTRACT_TYPES["LlamaPay"], "withdrawable", pool.address, pool.address, 1
+        ),
+    ]
+
+
+def test_multicall(pool):
+    token, divisor, payer, withdrawable = Multicall()(pool_calls(pool))
+    assert token == pool.token.address
+    assert divisor == pool.internal_scale
+    assert payer == (0, 0)
+    assert withdrawable is None
+
+
+def test_multicall_chunks(pool):
+    calls = pool_calls(pool) * 5
+    assert Multicall(chunk_size=3)(calls) == Multicall()(calls)
+
+
+def test_multicall_fallback(pool, chain):
+    multicall = Multicall()
+    expected = multicall(pool_calls(pool))
+    Multicall._deployed[chain.provider.chain_id] = False
+    try:
+        assert multicall(pool_calls(pool)) == expected
+    finally:
+        del Multicall._deployed[chain.provider.chain_id]
+
+
+def test_pools_metadata(factory):
+    pools = factory.pools
+    dai = next(pool for pool in pools if pool.symbol == "DAI")
+    # decimals were read in bulk, so the scale comes from the cache without a call
+    dai.__dict__.pop("scale", None)
+    hits = TOKEN_METADATA.hits
+    assert dai.scale == 10**18
+    assert TOKEN_METADATA.hits == hits + 1
+    assert dai.__dict__["internal_scale"] == 100
+    assert dai == factory.get_pool("DAI")
+
+
+class BrokenEth:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def get_code(self, address):
+        return b"\x01"
+
+    def call(self, *args):
+        self.calls += 1
+        raise self.error
+
+
+class BrokenMulticall(Multicall):
+    def __init__(self, error, **kwargs):
+        super().__init__(**kwargs)
+        self.eth = BrokenEth(error)
+
+    @property
+    def web3(self):
+        return self
+
+
+def test_multicall_raises_provider_errors(pool):
+    multicall = BrokenMulticall(ConnectionError("connection refused"))
+    with pytest.raises(ConnectionError):
+        multicall(pool_calls(pool) * 10)
+    # no bisecting when the provider is down
+    assert multicall.eth.calls == 1
+
+
+def test_multicall_splits_large_batches(pool):
+    multicall = BrokenMulticall(ValueError("out of gas"))
+    with pytest.raises(ValueError):
+        multicall(pool_calls(pool))
+    # split in halves down to a single call, which can't be split any further
+    assert multicall.eth.calls == 3
+
+
+def test_multicall_no_target():
+    call = Call.from_abi(None, CONTRACT_TYPES["LlamaPay"], "token")
+    with pytest.raises(ValueError, match="no target"):
+        Multicall()([call])
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from llamapay.exceptions import PoolNotDeployed
+from llamapay.llamapay import convert_rate
+from llamapay.payroll import PayrollRow, load_rows, reconcile
+
+
+def test_load_rows(tmp_path):
+    path = tmp_path / "payroll.csv"
+    path.write_text("recipient,rate,token\nbanteg.eth,1000 DAI/month,DAI\n")
+    assert load_rows(path) == [PayrollRow("banteg.eth", "1000 DAI/month", "DAI")]
+
+    path = tmp_path / "payroll.json"
+    path.write_text(json.dumps([{"recipient": "banteg.eth", "rate": 10**18, "token": "DAI"}]))
+    assert load_rows(path) == [PayrollRow("banteg.eth", 10**18, "DAI")]
+
+
+def test_reconcile(factory, pool, bird, bee, accounts, token):
+    wasp = accounts[2]
+    rows = [PayrollRow(str(bee), "100 DAI/month", "DAI")]
+    plan = reconcile(factory, rows, bird)
+    # the account is kept for signing
+    assert plan.sender is bird and plan.address == str(bird)
+    assert [change.action for change in plan.changes[pool]] == ["create"]
+    assert plan.deposits[pool] > 0
+    plan.show()
+    plan.execute()
+
+    # nothing to do once the payroll is applied
+    plan = reconcile(factory, rows, bird)
+    assert len(plan) == 0
+    assert plan.unchanged == 1
+
+    rows = [PayrollRow(str(bee), "200 DAI/month", "DAI")]
+    plan = reconcile(factory, rows, bird, runway=None)
+    assert [change.action for change in plan.changes[pool]] == ["modify"]
+    plan.execute()
+    (stream,) = pool.find_streams(source=bird)
+    assert stream.rate == convert_rate("200 DAI/month")
+
+    # a recipient leaving and another joining is a single modification
+    rows = [PayrollRow(str(wasp), "200 DAI/month", "DAI")]
+    plan = reconcile(factory, rows, bird, runway=None)
+    (change,) = plan.changes[pool]
+    assert change.action == "modify" and change.new_stream.target == str(wasp)
+
+    plan = reconcile(factory, [], bird)
+    assert [change.action for change in plan.changes[pool]] == ["cancel"]
+
+
+def test_reconcile_without_pool(factory, bird, bee):
+    rows = [PayrollRow(str(bee), "100 DAI/month", "DAI"), PayrollRow(str(bee), "1 UST/day", "UST")]
+    with pytest.raises(PoolNotDeployed, match="UST"):
+        reconcile(factory, rows, bird)
@@ -1,6 +1,10 @@
 from decimal import Decimal
 
 import pytest
+from conftest import set_balance
+
+from llamapay import Factory, StreamStatus
+from llamapay.store import LogStore
 
 
 def test_pool_get_balance(pool):
@@ -56,3 +60,62 @@ def test_pool_create_stream(pool, bird, bee):
 def test_factory_create_stream(factory, bird, bee):
     stream = factory.create_stream(bee, "1000 DAI/month", sender=bird)
     print(stream)
+
+
+def test_pool_permit_domain(factory, pool):
+    # dai has a non-standard permit
+    assert pool.permit_domain is None
+    usdc = factory.get_pool("USDC")
+    assert usdc.permit_domain["version"] == "2"
+
+
+def test_pool_deposit_and_create(pool, token, bird, bee):
+    stream = pool.make_stream(bird, bee, "100 DAI/month")
+    receipt = pool.deposit_and_create(stream, "1000 DAI", reason="salary", sender=bird)
+    log = next(receipt.decode_logs(pool.contract.StreamCreatedWithReason))
+    assert log.streamId == stream.id
+    assert log.reason == "salary"
+
+
+def test_pool_deposit_and_create_permit(factory, bird, bee):
+    usdc = factory.get_pool("USDC")
+    set_balance(str(usdc.token), str(bird), 10**12, storage_index=9)
+    stream = usdc.make_stream(bird, bee, "100 USDC/month")
+    receipt = usdc.deposit_and_create(stream, "1000 USDC", sender=bird)
+    # permit and create happen in the same transaction
+    assert next(receipt.decode_logs(usdc.contract.StreamCreated)).streamId == stream.id
+    assert usdc.token.allowance(bird, usdc.address) == 0
+    assert usdc.get_balance(bird) > 0
+
+
+def test_pool_iter_logs(pool, chain):
+    head = chain.blocks.height
+    logs = list(pool.iter_logs(stop=head))
+    pool._refresh_logs()
+    assert len(logs) == len([log for log in pool._logs if log.block_number <= head])
+
+    created = list(pool.iter_logs(stop=head, events=["StreamCreated"]))
+    assert created and all(log.name == "StreamCreated" for log in created)
+
+
+def test_pool_iter_streams(pool):
+    streams = pool.iter_streams()
+    assert next(streams) in pool.all_streams
+
+
+def test_pool_without_logs(pool):
+    factory = Factory(keep_logs=False)
+    light = factory.get_pool("DAI")
+    assert light.all_streams == pool.all_streams
+    assert light._logs == []
+
+
+def test_pool_cold_lookup(pool):
+    source = pool.all_streams[0].source
+    cold = Factory(store=LogStore()).get_pool("DAI")
+    for status in [StreamStatus.ACTIVE, None]:
+        assert cold.find_streams(source=source, status=status) == pool.find_streams(
+            source=source, status=status
+        )
+    # only the events of the source were fetched, the pool is still not indexed
+    assert cold._last_logs_block is None
@@ -0,0 +1,36 @@
+def test_snapshot(pool, stream, bird, bee, token, chain):
+    pool.deposit("1000 DAI", sender=bird)
+    stream.create(sender=bird)
+    chain.mine()
+
+    snapshot = pool.snapshot(streams=[stream])
+    assert snapshot.payers == [stream.source]
+
+    result = pool.contract.withdrawable(stream.source, stream.target, stream.rate)
+    assert snapshot.withdrawable == [result.withdrawableAmount]
+    assert snapshot.last_update == [result.lastUpdate]
+    assert snapshot.owed == [result.owed]
+    assert snapshot.stream_balances() == [stream.balance]
+
+    assert snapshot.payer_balances == [pool.contract.getPayerBalance(stream.source)]
+    assert snapshot.payer_token_balances() == [pool.get_balance(stream.source)]
+    assert snapshot.total_paid_per_sec[0] >= stream.rate
+
+
+def test_snapshot_pinned_to_block(pool, stream, bird, chain):
+    pool.deposit("1000 DAI", sender=bird)
+    stream.create(sender=bird)
+    block = chain.blocks.height
+    chain.mine(10)
+
+    snapshot = pool.snapshot(streams=[stream], block=block)
+    assert snapshot.block == block
+    assert snapshot.timestamp == chain.blocks[block].timestamp
+    assert snapshot.withdrawable == [0]
+
+
+def test_snapshot_missing_stream(pool, bird, bee):
+    missing = pool.make_stream(bee, bird, 12345)
+    snapshot = pool.snapshot(streams=[missing])
+    assert snapshot.withdrawable == [None]
+    assert snapshot.payer_balances == [0]
@@ -0,0 +1,31 @@
+import pytest
+
+from llamapay.engine import Engine
+from llamapay.solvency import convert_duration
+
+
+@pytest.mark.parametrize(
+    "duration,seconds",
+    [(3600, 3600), ("week", 604_800), ("2 weeks", 1_209_600), ("1.5 days", 129_600)],
+)
+def test_convert_duration(duration, seconds):
+    assert convert_duration(duration) == seconds
+
+
+def test_pool_solvency(pool, stream, bird, token):
+    pool.deposit("1 DAI", sender=bird)
+    stream.create(sender=bird)
+    snapshot = pool.snapshot(streams=[stream])
+    (insolvent_at,) = Engine(snapshot).insolvency_time()
+
+    rows = pool.solvency(block=snapshot.block)
+    assert [row.runway for row in rows] == sorted(row.runway for row in rows)
+    (row,) = [row for row in rows if row.payer == bird]
+    assert row.insolvent_at == insolvent_at
+    assert row.runway == insolvent_at - snapshot.timestamp
+
+
+def test_factory_solvency_report(factory, stream, bird, token):
+    report = factory.solvency_report(threshold="1 year")
+    assert all(row.runway <= convert_duration("year") for row in report)
+    assert bird in [row.payer for row in report]
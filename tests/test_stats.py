@@ -0,0 +1,36 @@
+from llamapay import Stream, stats
+from llamapay.stats import Histogram
+
+
+def test_histogram():
+    histogram = Histogram()
+    for ms in [0.5, 3, 3, 7000]:
+        histogram.add(ms)
+    summary = histogram.to_dict()
+    assert summary["count"] == 4
+    assert summary["max_ms"] == 7000
+    assert summary["buckets"]["<=1ms"] == 1
+    assert summary["buckets"]["<=5ms"] == 2
+    assert summary["buckets"][">5000ms"] == 1
+
+
+def test_stats_scope(pool, stream, bird, bee, token):
+    streams = [pool.make_stream(bird, bee, 10**18 + i) for i in range(3)]
+    with pool.batch(sender=bird) as batch:
+        for item in streams:
+            batch.create(item)
+    pool.scale
+
+    with stats.scope() as counters:
+        for item in streams:
+            item.balance
+
+    scoped = counters.stats()
+    # one call per stream, the pattern to replace with a snapshot
+    assert scoped["operations"]["Stream.balance"]["calls"] == 3
+    assert scoped["operations"]["Stream.balance"]["rpc"] >= 3
+    assert scoped["functions"]["LlamaPay.withdrawable"] == 3
+    assert scoped["latency"]["eth_call"]["count"] >= 3
+    # instrumentation is removed when the scope ends
+    assert not stats.enabled()
+    assert Stream.balance.fget.__name__ == "balance"
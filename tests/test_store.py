@@ -0,0 +1,135 @@
+import threading
+
+from ape.types import ContractLog
+
+from llamapay import Pool
+from llamapay.logs import Page
+from llamapay.store import LogStore
+
+POOL = "0x0000000000000000000000000000000000000001"
+
+
+def make_log(block_number, log_index=0, name="StreamCreated"):
+    return ContractLog(
+        name=name,
+        contract_address=POOL,
+        event_arguments={
+            "from": "0x0000000000000000000000000000000000000002",
+            "to": "0x0000000000000000000000000000000000000003",
+            "amountPerSec": 10**18,
+            "streamId": b"\x01" * 32,
+        },
+        transaction_hash="0x" + "ab" * 32,
+        block_number=block_number,
+        block_hash="0x" + "cd" * 32,
+        log_index=log_index,
+    )
+
+
+def test_store_roundtrip(tmp_path):
+    store = LogStore(tmp_path / "events.db")
+    assert store.get_checkpoint(1, POOL) is None
+
+    store.save(1, POOL, [make_log(10, 1), make_log(10, 0), make_log(12)], last_block=15)
+    assert store.get_checkpoint(1, POOL) == 15
+    assert store.get_checkpoint(10, POOL) is None
+
+    logs = store.load(1, POOL)
+    assert [(log.block_number, log.log_index) for log in logs] == [(10, 0), (10, 1), (12, 0)]
+    assert logs[0].event_arguments["streamId"] == b"\x01" * 32
+    assert logs[0].amountPerSec == 10**18
+
+    assert len(store.load(1, POOL, stop_block=11)) == 2
+
+
+def test_store_persists_across_instances(tmp_path):
+    LogStore(tmp_path / "events.db").save(1, POOL, [make_log(10)], last_block=20)
+    store = LogStore(tmp_path / "events.db")
+    assert store.get_checkpoint(1, POOL) == 20
+    assert len(store.load(1, POOL)) == 1
+
+
+def test_store_truncate(tmp_path):
+    store = LogStore(tmp_path / "events.db")
+    store.save(1, POOL, [make_log(10), make_log(12)], last_block=15)
+    store.truncate(1, POOL, from_block=12)
+    assert store.get_checkpoint(1, POOL) == 11
+    assert len(store.load(1, POOL)) == 1
+
+
+def test_store_deploy_block(tmp_path):
+    store = LogStore(tmp_path / "events.db")
+    assert store.get_deploy_block(1, "0xabc") is None
+    store.save_deploy_block(1, "0xabc", 123)
+    assert LogStore(tmp_path / "events.db").get_deploy_block(1, "0xabc") == 123
+
+
+def test_pool_resumes_from_store(factory, pool):
+    pool._refresh_logs()
+    head = pool._last_logs_block - 1
+    # on a fork only the blocks before the fork point are shared with the upstream index
+    checkpoint = factory.store_limit(head)
+    logs = [log for log in pool._logs if log.block_number <= checkpoint]
+    store = LogStore()
+    store.save(factory.chain_id, pool.address, logs, last_block=checkpoint)
+
+    factory.store, original = store, factory.store
+    try:
+        resumed = Pool(pool.address, factory=factory)
+        resumed._load_stored_logs(head)
+        assert resumed._last_logs_block == checkpoint + 1
+        assert len(resumed._logs) == len(logs)
+    finally:
+        factory.store = original
+
+
+def test_fork_ignores_store_past_fork_point(factory, pool, chain):
+    head = chain.blocks.height
+    assert factory.fork_block is not None
+    fork_point = max(factory.fork_block, factory.deploy_block)
+    # an upstream index which got further than the fork
+    upstream = make_log(fork_point + 1)
+    store = LogStore()
+    store.save(factory.chain_id, pool.address, [upstream], last_block=head + 100)
+
+    factory.store, original = store, factory.store
+    try:
+        resumed = Pool(pool.address, factory=factory)
+        resumed._load_stored_logs(head)
+        assert resumed._last_logs_block <= fork_point + 1
+        assert upstream not in resumed._logs
+        assert upstream not in list(resumed.iter_logs(start=fork_point + 1, stop=head))
+    finally:
+        factory.store = original
+
+
+def test_pool_saves_blocks_which_became_safe(factory, pool):
+    store = LogStore()
+    factory.store, original_store = store, factory.store
+    factory.persist, original_persist = True, factory.persist
+    try:
+        resumed = Pool(pool.address, factory=factory)
+        resumed._stored_block, resumed._last_logs_block = 99, 100
+        # nothing after the stored block is safe yet, 220 - REORG_DEPTH is below it
+        resumed._index_page(Page(100, 200, [make_log(150)]), head=220)
+        assert store.get_checkpoint(factory.chain_id, pool.address) is None
+        # by the next refresh the earlier blocks are safe and get saved too
+        resumed._index_page(Page(201, 300, [make_log(250, name="StreamPaused")]), head=400)
+        assert store.get_checkpoint(factory.chain_id, pool.address) == 272
+        stored = store.load(factory.chain_id, pool.address)
+        assert [log.block_number for log in stored] == [150, 250]
+    finally:
+        factory.store, factory.persist = original_store, original_persist
+
+
+def test_store_shared_between_processes(tmp_path):
+    store = LogStore(tmp_path / "events.db", timeout=5)
+    other = LogStore(tmp_path / "events.db", timeout=5)
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # a write waits for the other writer to finish instead of failing with "database is locked"
+    other._conn.execute("BEGIN IMMEDIATE")
+    timer = threading.Timer(0.5, other._conn.commit)
+    timer.start()
+    store.save(1, POOL, [make_log(10)], last_block=20)
+    timer.join()
+    assert other.get_checkpoint(1, POOL) == 20
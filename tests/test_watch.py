@@ -0,0 +1,78 @@
+from ape.types import ContractLog
+
+from llamapay import Factory
+from llamapay.index import StreamIndex, StreamStatus
+from llamapay.watch import EventKind, stream_event
+
+BIRD = "0x0000000000000000000000000000000000000002"
+BEE = "0x0000000000000000000000000000000000000003"
+
+
+def make_log(name, stream, block_number):
+    return ContractLog(
+        name=name,
+        contract_address=BIRD,
+        event_arguments={
+            "from": stream.source,
+            "to": stream.target,
+            "amountPerSec": stream.rate,
+            "streamId": stream.id,
+        },
+        transaction_hash="0x" + "ab" * 32,
+        block_number=block_number,
+        block_hash="0x" + "cd" * 32,
+        log_index=0,
+    )
+
+
+def test_index_rollback(pool):
+    index = StreamIndex(pool)
+    stream = pool.make_stream(BIRD, BEE, 10**18)
+    other = pool.make_stream(BEE, BIRD, 10**18)
+
+    index.apply(make_log("StreamCreated", stream, 10), journal=True)
+    index.apply(make_log("StreamPaused", stream, 11), journal=True)
+    index.apply(make_log("StreamCreated", other, 12), journal=True)
+
+    index.rollback(11)
+    assert index.status(stream.id) == StreamStatus.ACTIVE
+    assert index.status(other.id) is None
+    assert index.find(source=BEE, status=None) == []
+    assert len(index) == 1
+
+    # pruned changes can't be undone
+    index.prune(11)
+    index.rollback(0)
+    assert index.find(source=BIRD) == [stream]
+
+
+def test_stream_event(pool):
+    stream = pool.make_stream(BIRD, BEE, 10**18)
+    event = stream_event(pool, make_log("StreamPaused", stream, 1))
+    assert event.kind == EventKind.PAUSED
+    assert event.stream == stream
+    assert not event.removed
+
+
+def test_pool_watch(bird, bee, token):
+    pool = Factory().get_pool("DAI")
+    watcher = pool.watch(confirmations=0, poll_interval=0)
+    stream = pool.make_stream(bird, bee, "1 DAI/day")
+    stream.create(sender=bird)
+
+    events = watcher.poll()
+    assert [(event.kind, event.stream) for event in events] == [(EventKind.CREATED, stream)]
+    assert stream in pool.find_streams(source=bird)
+    watcher.close()
+
+
+def test_pool_watch_forgets_unconfirmed(bird, bee, token):
+    pool = Factory().get_pool("DAI")
+    stream = pool.make_stream(bird, bee, "1 DAI/day")
+    stream.create(sender=bird)
+    assert stream in pool.find_streams(source=bird)
+
+    # indexed without a journal, the watcher has to rebuild the index to drop it
+    watcher = pool.watch(confirmations=1, poll_interval=0)
+    assert stream not in pool.find_streams(source=bird)
+    watcher.close()